@@ -1,7 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
     verbose_name = 'API приложение  для всех действий'
+
+    def ready(self):
+        from api import signals  # noqa: F401
+        from api.querylog import install_query_log
+        connection_created.connect(install_query_log)
@@ -0,0 +1,202 @@
+from math import ceil
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.urls import URLPattern
+from rest_framework.authtoken.models import Token
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from api.cache import acached_for_anonymous, recipe_responses
+from api.filters import IngredientFilter, RecipeFilter
+from api.metrics import TimedJSONRenderer
+from api.pagination import LimitPagination
+from api.recipe_rows import recipe_rows
+from api.serializers import (
+    IngredientSerializer, RecipeReadSerializer, TagSerializer
+)
+from api.user_flags import UserFlags
+from recipes.models import Ingredient, Recipe, Tag
+
+renderer = TimedJSONRenderer()
+
+
+def json_response(data):
+    return HttpResponse(
+        renderer.render(data),
+        content_type=renderer.media_type,
+        headers={'Vary': 'Accept'},
+    )
+
+
+async def authenticate(request):
+    header = request.headers.get('Authorization', '').split()
+    if not header:
+        return AnonymousUser()
+    if len(header) != 2 or header[0].lower() != 'token':
+        return None
+    token = await Token.objects.select_related('user').filter(
+        key=header[1]
+    ).afirst()
+    if token is None or not token.user.is_active:
+        return None
+    return token.user
+
+
+def page_size(request):
+    try:
+        size = int(request.GET[LimitPagination.page_size_query_param])
+    except (KeyError, ValueError):
+        return LimitPagination.page_size
+    return size if size > 0 else LimitPagination.page_size
+
+
+def page_link(request, page_number):
+    url = request.build_absolute_uri()
+    if page_number == 1:
+        return remove_query_param(url, 'page')
+    return replace_query_param(url, 'page', page_number)
+
+
+async def get_object(queryset, pk):
+    if not pk.isdigit():
+        return None
+    return await queryset.filter(pk=pk).afirst()
+
+
+async def tag_list(request):
+    tags = [tag async for tag in Tag.objects.all()]
+    return json_response(TagSerializer(tags, many=True).data)
+
+
+async def tag_detail(request, pk):
+    tag = await get_object(Tag.objects.all(), pk)
+    if tag is None:
+        return None
+    return json_response(TagSerializer(tag).data)
+
+
+async def ingredient_list(request):
+    filterset = IngredientFilter(
+        request.GET, queryset=Ingredient.objects.all(), request=request
+    )
+    if not filterset.is_valid():
+        return None
+    ingredients = [ingredient async for ingredient in filterset.qs]
+    return json_response(IngredientSerializer(ingredients, many=True).data)
+
+
+async def ingredient_detail(request, pk):
+    ingredient = await get_object(Ingredient.objects.all(), pk)
+    if ingredient is None:
+        return None
+    return json_response(IngredientSerializer(ingredient).data)
+
+
+@acached_for_anonymous(recipe_responses)
+async def recipe_list(request):
+    if 'ids' in request.GET:
+        return None
+    filterset = RecipeFilter(
+        request.GET, queryset=Recipe.objects.all(), request=request
+    )
+    if not await sync_to_async(filterset.is_valid)():
+        return None
+    queryset = filterset.qs
+    size = page_size(request)
+    page_number = request.GET.get('page', '1')
+    if not page_number.isdigit() or int(page_number) < 1:
+        return None
+    page_number = int(page_number)
+    count = await queryset.acount()
+    if page_number > max(ceil(count / size), 1):
+        return None
+    offset = (page_number - 1) * size
+    recipes = [
+        recipe async for recipe in recipe_rows(queryset)[offset:offset + size]
+    ]
+    serializer = RecipeReadSerializer(
+        recipes, many=True, context={'request': request}
+    )
+    serializer.context['user_flags'] = await UserFlags.aload(
+        request.user, recipes, serializer.child.flag_kinds()
+    )
+    results = await sync_to_async(lambda: serializer.data)()
+    return json_response({
+        'count': count,
+        'next': (
+            page_link(request, page_number + 1)
+            if offset + size < count else None
+        ),
+        'previous': (
+            page_link(request, page_number - 1)
+            if page_number > 1 else None
+        ),
+        'results': results,
+    })
+
+
+@acached_for_anonymous(recipe_responses)
+async def recipe_detail(request, pk):
+    context = {'request': request}
+    serializer = RecipeReadSerializer(context=context)
+    recipe = await get_object(
+        Recipe.objects.for_read(serializer.prefetch_lookups()), pk
+    )
+    if recipe is None:
+        return None
+    context['user_flags'] = await UserFlags.aload(
+        request.user, [recipe], serializer.flag_kinds()
+    )
+    return json_response(RecipeReadSerializer(recipe, context=context).data)
+
+
+def async_read(sync_view, async_view):
+    """GET-запросы обслуживает async_view, остальное — исходный вьюсет.
+
+    async_view возвращает None, если запрос требует полной обработки DRF:
+    ошибки фильтров, несуществующие объекты, неверные страницы и токены.
+    """
+
+    async def view(request, *args, **kwargs):
+        if (
+            request.method == 'GET'
+            and 'format' not in kwargs
+            and 'format' not in request.GET
+            and 'text/html' not in request.headers.get('Accept', '')
+        ):
+            user = await authenticate(request)
+            if user is not None:
+                request.user = user
+                response = await async_view(request, *args, **kwargs)
+                if response is not None:
+                    return response
+        return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+    view.csrf_exempt = True
+    view.cls = sync_view.cls
+    view.actions = sync_view.actions
+    return view
+
+
+ASYNC_READ_VIEWS = {
+    'tags-list': tag_list,
+    'tags-detail': tag_detail,
+    'ingredients-list': ingredient_list,
+    'ingredients-detail': ingredient_detail,
+    'recipes-list': recipe_list,
+    'recipes-detail': recipe_detail,
+}
+
+
+def with_async_reads(urls):
+    return [
+        URLPattern(
+            url.pattern,
+            async_read(url.callback, ASYNC_READ_VIEWS[url.name]),
+            url.default_args,
+            url.name,
+        )
+        if url.name in ASYNC_READ_VIEWS else url
+        for url in urls
+    ]
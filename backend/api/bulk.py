@@ -0,0 +1,112 @@
+"""Массовое добавление и удаление избранного, покупок и подписок.
+
+Любое число id обрабатывается постоянным числом запросов: один запрос
+проверяет, какие объекты существуют и какие уже добавлены, затем один
+bulk_create или один delete. Счетчики избранного, ленты подписок и журнал
+состояния пользователя обновляются здесь же, а не сигналами на каждую
+запись. Счетчик избранного пересчитывается подзапросом Count, а не
+увеличивается на число добавленных: статус added берется из проверки до
+вставки, и параллельный запрос мог уже добавить ту же связь.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from api.feed import backfill_authors, unfollow_authors
+from api.signals import bulk_change
+from api.user_state import MODEL_KINDS, record_changes
+from recipes.models import Favorite, Follow, ProjectUser, Recipe
+
+ADDED = 'added'
+EXISTS = 'exists'
+REMOVED = 'removed'
+MISSING = 'missing'
+NOT_FOUND = 'not_found'
+SELF = 'self'
+
+
+def results(ids, statuses):
+    return [
+        {'id': pk, 'status': statuses.get(pk, NOT_FOUND)}
+        for pk in dict.fromkeys(ids)
+    ]
+
+
+def links(model, user, field):
+    return model.objects.filter(user=user, **{field: OuterRef('pk')})
+
+
+def add(model, user, field, targets, ids):
+    """Создает связи user → объект и возвращает id созданных и статусы."""
+    statuses = {
+        pk: EXISTS if linked else ADDED
+        for pk, linked in targets.filter(pk__in=ids).annotate(
+            linked=Exists(links(model, user, field))
+        ).values_list('pk', 'linked')
+    }
+    added = [pk for pk, status in statuses.items() if status == ADDED]
+    model.objects.bulk_create(
+        [model(user=user, **{f'{field}_id': pk}) for pk in added],
+        ignore_conflicts=True,
+    )
+    return added, statuses
+
+
+def remove(model, user, field, ids):
+    """Удаляет связи user → объект и возвращает id удаленных и статусы."""
+    related = model.objects.filter(user=user, **{f'{field}__in': ids})
+    removed = list(related.values_list(field, flat=True))
+    token = bulk_change.set(True)
+    try:
+        related.delete()
+    finally:
+        bulk_change.reset(token)
+    statuses = dict.fromkeys(ids, MISSING)
+    statuses.update(dict.fromkeys(removed, REMOVED))
+    return removed, statuses
+
+
+def count_favorites(recipe_ids):
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        favorites_count=Coalesce(
+            Subquery(
+                Favorite.objects.filter(recipe=OuterRef('pk')).order_by()
+                .values('recipe').annotate(count=Count('pk'))
+                .values('count')
+            ),
+            0,
+        )
+    )
+
+
+@transaction.atomic
+def change_recipes(model, user, ids, adding):
+    if adding:
+        changed, statuses = add(model, user, 'recipe', Recipe.objects, ids)
+    else:
+        changed, statuses = remove(model, user, 'recipe', ids)
+    transaction.on_commit(partial(
+        record_changes, user.pk, MODEL_KINDS[model], changed
+    ))
+    if model is Favorite and changed:
+        count_favorites(changed)
+    return results(ids, statuses)
+
+
+@transaction.atomic
+def change_subscriptions(user, ids, adding):
+    authors = ProjectUser.objects.exclude(pk=user.pk)
+    if adding:
+        changed, statuses = add(Follow, user, 'author', authors, ids)
+        transaction.on_commit(partial(backfill_authors, user.pk, changed))
+    else:
+        changed, statuses = remove(Follow, user, 'author', ids)
+        unfollow_authors(user.pk, changed)
+    transaction.on_commit(partial(
+        record_changes, user.pk, MODEL_KINDS[Follow], changed
+    ))
+    if user.pk in ids:
+        statuses[user.pk] = SELF
+    return results(ids, statuses)
@@ -0,0 +1,197 @@
+from functools import wraps
+from hashlib import md5
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from api.db_routers import primary_reads
+from api.metrics import registry
+from api.recipe_rows import recipe_payloads
+from recipes.generations import (
+    INGREDIENTS, RECIPES, SCORES, TAGS, USERS, aget_generations,
+    get_generations
+)
+
+JSON_CONTENT_TYPE = 'application/json'
+
+
+class ResponseCache:
+    """Готовые JSON-ответы анонимам с инвалидацией по поколениям моделей."""
+
+    def __init__(self, name, generations):
+        self.name = name
+        self.generations = generations
+
+    def applies(self, request):
+        return (
+            request.method == 'GET'
+            and 'HTTP_AUTHORIZATION' not in request.META
+        )
+
+    def key(self, request, generations):
+        query = urlencode(sorted(
+            (name, value)
+            for name, values in request.GET.lists()
+            for value in values
+        ))
+        url = f'{request.scheme}://{request.get_host()}{request.path}?{query}'
+        return (
+            f'response:{self.name}:{generations}:'
+            f'{md5(url.encode()).hexdigest()}'
+        )
+
+    def lookup(self, request):
+        key = self.key(request, get_generations(self.generations))
+        content = cache.get(key)
+        registry.observe_cache(self.name, content is not None)
+        return key, content
+
+    async def alookup(self, request):
+        key = self.key(request, await aget_generations(self.generations))
+        content = await cache.aget(key)
+        registry.observe_cache(self.name, content is not None)
+        return key, content
+
+    def store(self, key, content):
+        cache.set(key, content, settings.RESPONSE_CACHE_TIMEOUT)
+
+    async def astore(self, key, content):
+        await cache.aset(key, content, settings.RESPONSE_CACHE_TIMEOUT)
+
+
+recipe_responses = ResponseCache(
+    'recipe_responses', (RECIPES, TAGS, INGREDIENTS, USERS, SCORES)
+)
+
+
+class RecipeFragments:
+    """Не зависящие от пользователя представления рецептов.
+
+    Ключ — id рецепта, его updated_at, набор выбранных полей и поколения
+    тегов, продуктов и пользователей; флаги is_favorited, is_in_shopping_cart и
+    author.is_subscribed накладываются поверх из UserFlags страницы.
+    Рецепты, которых нет в кеше, собираются из строк БД в recipe_payloads;
+    связанные данные для них читаются из primary.
+    """
+
+    name = 'recipe_fragments'
+    generations = (TAGS, INGREDIENTS, USERS)
+
+    def key(self, recipe, request, generations, fields):
+        return (
+            f'fragment:recipe:{generations}:{fields}:{recipe.id}:'
+            f'{recipe.updated_at.timestamp()}:{request.get_host()}'
+        )
+
+    def represent(self, serializer, recipes, user_flags):
+        request = serializer.context['request']
+        generations = get_generations(self.generations)
+        fields = md5(','.join(serializer.fields).encode()).hexdigest()[:12]
+        keys = [
+            self.key(recipe, request, generations, fields)
+            for recipe in recipes
+        ]
+        fragments = cache.get_many(keys)
+        misses = [
+            (key, recipe) for key, recipe in zip(keys, recipes)
+            if key not in fragments
+        ]
+        registry.observe_cache(
+            self.name, True, len(recipes) - len(misses)
+        )
+        registry.observe_cache(self.name, False, len(misses))
+        if misses:
+            with primary_reads():
+                fresh = dict(zip(
+                    [key for key, _ in misses],
+                    recipe_payloads(
+                        serializer, [recipe for _, recipe in misses]
+                    ),
+                ))
+            cache.set_many(fresh, settings.RESPONSE_CACHE_TIMEOUT)
+            fragments.update(fresh)
+        if not request.user.is_authenticated:
+            return [fragments[key] for key in keys]
+        return [
+            self.overlay(fragments[key], recipe, user_flags)
+            for key, recipe in zip(keys, recipes)
+        ]
+
+    def overlay(self, fragment, recipe, user_flags):
+        fragment = dict(fragment)
+        if 'author' in fragment:
+            fragment['author'] = {
+                **fragment['author'],
+                'is_subscribed': recipe.author_id in user_flags.subscribed,
+            }
+        if 'is_favorited' in fragment:
+            fragment['is_favorited'] = recipe.id in user_flags.favorited
+        if 'is_in_shopping_cart' in fragment:
+            fragment['is_in_shopping_cart'] = (
+                recipe.id in user_flags.in_shopping_cart
+            )
+        return fragment
+
+
+recipe_fragments = RecipeFragments()
+
+
+def cached_response(content):
+    """Ответ из кеша с тем же Vary: Accept, что у ответа DRF.
+
+    Без него HTML browsable API и JSON делили бы запись в кешах HTTP.
+    """
+    return HttpResponse(
+        content, content_type=JSON_CONTENT_TYPE, headers={'Vary': 'Accept'}
+    )
+
+
+def cached_for_anonymous(response_cache):
+    """Кеширует JSON-ответы действия вьюсета для анонимных клиентов.
+
+    При промахе действие читает из primary: ответ отставшей реплики иначе
+    попал бы в кеш под новым поколением на весь RESPONSE_CACHE_TIMEOUT.
+    """
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if (
+                not response_cache.applies(request)
+                or request.accepted_renderer.format != 'json'
+            ):
+                return method(self, request, *args, **kwargs)
+            key, content = response_cache.lookup(request)
+            if content is not None:
+                return cached_response(content)
+            with primary_reads():
+                response = method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                def store(response):
+                    response_cache.store(key, response.content)
+                response.add_post_render_callback(store)
+            return response
+        return wrapper
+    return decorator
+
+
+def acached_for_anonymous(response_cache):
+    """То же для асинхронных read-вьюх, возвращающих HttpResponse или None."""
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if not response_cache.applies(request):
+                return await view(request, *args, **kwargs)
+            key, content = await response_cache.alookup(request)
+            if content is not None:
+                return cached_response(content)
+            with primary_reads():
+                response = await view(request, *args, **kwargs)
+            if response is not None and response.status_code == 200:
+                await response_cache.astore(key, response.content)
+            return response
+        return wrapper
+    return decorator
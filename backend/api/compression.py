@@ -0,0 +1,151 @@
+"""Сжатие ответов gzip или brotli по заголовку Accept-Encoding.
+
+brotli используется, если установлен пакет Brotli и клиент его принимает,
+иначе gzip. Ответ меньше COMPRESSION_MIN_SIZE байт и ответ, который
+от сжатия не уменьшился, отдаются как есть. Потоковые ответы сжимаются
+по мере отдачи, с досылкой каждого блока клиенту.
+
+Сжимаются только ответы API в JSON и текстовая выгрузка списка покупок.
+HTML-страницы (админка, browsable API) несут CSRF-токен рядом с
+отраженным вводом из запроса, и по размеру их сжатого ответа токен можно
+подобрать (атака BREACH), поэтому они отдаются без сжатия.
+"""
+import gzip
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from api.metrics import measure
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BROTLI = 'br'
+GZIP = 'gzip'
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSED_PATHS = ('/api/',)
+COMPRESSED_CONTENT_TYPES = ('application/json', 'text/plain')
+
+
+def accepted_codings(accept_encoding):
+    for item in accept_encoding.lower().split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0
+        if quality > 0:
+            yield coding
+
+
+def negotiate(accept_encoding):
+    codings = set(accepted_codings(accept_encoding))
+    if brotli is not None and BROTLI in codings:
+        return BROTLI
+    if GZIP in codings:
+        return GZIP
+    return None
+
+
+def compress(coding, content):
+    if coding == BROTLI:
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class StreamCompressor:
+    """Сжимает поток блоками, досылая каждый блок клиенту целиком."""
+
+    def __init__(self, coding):
+        self.coding = coding
+        if coding == BROTLI:
+            self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self.compressor = zlib.compressobj(
+                GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+            )
+
+    def compress(self, data):
+        if self.coding == BROTLI:
+            return self.compressor.process(data) + self.compressor.flush()
+        return (
+            self.compressor.compress(data)
+            + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        )
+
+    def finish(self):
+        if self.coding == BROTLI:
+            return self.compressor.finish()
+        return self.compressor.flush()
+
+
+def compress_sequence(coding, chunks):
+    compressor = StreamCompressor(coding)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def acompress_sequence(coding, chunks):
+    compressor = StreamCompressor(coding)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def compressible(request, response):
+    content_type = response.get('Content-Type', '').partition(';')[0]
+    return (
+        request.path.startswith(COMPRESSED_PATHS)
+        and content_type.strip().lower() in COMPRESSED_CONTENT_TYPES
+        and not response.has_header('Content-Encoding')
+    )
+
+
+def compress_response(request, response):
+    """Сжимает ответ в выбранной по запросу кодировке."""
+    if not compressible(request, response):
+        return response
+    patch_vary_headers(response, ('Accept-Encoding',))
+    coding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if coding is None:
+        return response
+    if response.streaming:
+        length = response.get('Content-Length')
+        if length is not None and int(length) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        if response.is_async:
+            response.streaming_content = acompress_sequence(
+                coding, response.streaming_content
+            )
+        else:
+            response.streaming_content = compress_sequence(
+                coding, response.streaming_content
+            )
+        del response['Content-Length']
+    else:
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        with measure('compress'):
+            compressed = compress(coding, response.content)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+    response['Content-Encoding'] = coding
+    return response
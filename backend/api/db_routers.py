@@ -0,0 +1,106 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from hashlib import sha256
+from time import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PRIMARY_COOKIE = 'primary_until'
+STICKY_CACHE_KEY = 'primary-until:{}'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+REPLICA_PATHS = ('/api/', '/s/')
+PROXY_REFRESH_HEADER = 'HTTP_X_CACHE_REFRESH'
+
+read_from_replica = ContextVar('read_from_replica', default=False)
+
+
+@contextmanager
+def primary_reads():
+    """Чтения внутри блока идут в primary и в запросе, читающем из реплик.
+
+    Так читают данные для общих кешей и индексов процесса: отставшая
+    реплика не должна попасть в них под новым поколением.
+    """
+    token = read_from_replica.set(False)
+    try:
+        yield
+    finally:
+        read_from_replica.reset(token)
+
+
+def client_key(request):
+    """Ключ клиента для липкости: токен или сессия, без запросов к БД."""
+    credentials = request.META.get('HTTP_AUTHORIZATION') or (
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+    if not credentials:
+        return None
+    return STICKY_CACHE_KEY.format(sha256(credentials.encode()).hexdigest())
+
+
+def sticks_to_primary(request):
+    now = time()
+    try:
+        if float(request.COOKIES.get(PRIMARY_COOKIE, 0)) > now:
+            return True
+    except ValueError:
+        pass
+    key = client_key(request)
+    return key is not None and cache.get(key, 0) > now
+
+
+def can_read_from_replica(request):
+    return (
+        request.method in SAFE_METHODS
+        and request.path.startswith(REPLICA_PATHS)
+        and request.META.get(PROXY_REFRESH_HEADER) != '1'
+        and not sticks_to_primary(request)
+    )
+
+
+def stick_to_primary(request, response):
+    """Направляет чтения клиента в primary на READ_YOUR_WRITES_SECONDS."""
+    window = settings.READ_YOUR_WRITES_SECONDS
+    until = time() + window
+    response.set_cookie(
+        PRIMARY_COOKIE, f'{until:.3f}', max_age=window, httponly=True,
+        samesite='Lax',
+    )
+    key = client_key(request)
+    if key is not None:
+        cache.set(key, until, window)
+
+
+class ReplicaRouter:
+    """Чтения безопасных API-запросов идут в реплики, остальное в primary.
+
+    Вне таких запросов (админка, команды, транзакции) все чтения остаются
+    в primary, поэтому код, записавший данные, сразу видит их.
+    """
+
+    def __init__(self):
+        self.replicas = [
+            alias for alias in settings.DATABASES
+            if alias != DEFAULT_DB_ALIAS
+        ]
+
+    def db_for_read(self, model, **hints):
+        if (
+            not self.replicas
+            or not read_from_replica.get()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,192 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as DecodeError
+from datetime import datetime
+from heapq import merge
+
+from django.conf import settings
+from django.db.models import Count, Q, Window
+from django.db.models.functions import RowNumber
+from rest_framework.exceptions import ValidationError
+
+from recipes.models import FeedEntry, Follow, ProjectUser, Recipe
+
+MAX_PAGE_SIZE = 100
+
+
+def update_high_follower_authors():
+    """Пересчитывает флаг feed_pulled авторов с большим числом подписчиков.
+
+    Флаг хранится в БД, поэтому все воркеры принимают одно и то же
+    решение о доставке рецептов автора; запросы его только читают.
+    Рецепты, опубликованные, пока флаг стоял, не разложены по лентам.
+    Поэтому выбывшим авторам флаг снимается до раскладки, а затем их
+    последние рецепты добавляются в ленты всех подписчиков: рецепт,
+    опубликованный после снятия флага, раскладывается при публикации.
+    Возвращает число авторов с флагом и число выбывших.
+    """
+    authors = set(
+        Follow.objects.values('author')
+        .annotate(followers=Count('id'))
+        .filter(followers__gt=settings.FEED_FANOUT_LIMIT)
+        .values_list('author', flat=True)
+    )
+    dropped = set(
+        ProjectUser.objects.filter(feed_pulled=True)
+        .exclude(pk__in=authors).values_list('pk', flat=True)
+    )
+    ProjectUser.objects.filter(pk__in=authors, feed_pulled=False).update(
+        feed_pulled=True
+    )
+    ProjectUser.objects.filter(pk__in=dropped).update(feed_pulled=False)
+    if dropped:
+        backfill_followers(dropped)
+    return len(authors), len(dropped)
+
+
+def entries(users, recipes):
+    return [
+        FeedEntry(
+            user_id=user_id,
+            recipe_id=recipe_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for user_id in users
+        for recipe_id, author_id, pub_date in recipes
+    ]
+
+
+def fan_out(recipe):
+    if ProjectUser.objects.filter(
+        pk=recipe.author_id, feed_pulled=True
+    ).exists():
+        return
+    FeedEntry.objects.bulk_create(
+        entries(
+            Follow.objects.filter(author=recipe.author_id)
+            .values_list('user', flat=True),
+            [(recipe.id, recipe.author_id, recipe.pub_date)],
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(follow):
+    backfill_authors(follow.user_id, [follow.author_id])
+
+
+def latest_recipes(author_ids):
+    """Последние FEED_BACKFILL рецептов каждого автора: (id, автор, дата)."""
+    return Recipe.objects.filter(author__in=author_ids).annotate(
+        position=Window(
+            RowNumber(),
+            partition_by='author',
+            order_by=('-pub_date', '-id'),
+        )
+    ).filter(
+        position__lte=settings.FEED_BACKFILL
+    ).values_list('id', 'author', 'pub_date')
+
+
+def backfill_authors(user_id, author_ids):
+    """Добавляет в ленту последние FEED_BACKFILL рецептов каждого автора."""
+    author_ids = set(
+        ProjectUser.objects.filter(pk__in=author_ids, feed_pulled=False)
+        .values_list('pk', flat=True)
+    )
+    if not author_ids:
+        return
+    FeedEntry.objects.bulk_create(
+        entries([user_id], latest_recipes(author_ids)),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def backfill_followers(author_ids):
+    """Добавляет последние рецепты авторов в ленты всех их подписчиков."""
+    recipes = {}
+    for recipe in latest_recipes(author_ids):
+        recipes.setdefault(recipe[1], []).append(recipe)
+    followers = {}
+    for user_id, author_id in Follow.objects.filter(
+        author__in=author_ids
+    ).values_list('user', 'author'):
+        followers.setdefault(author_id, []).append(user_id)
+    FeedEntry.objects.bulk_create(
+        [
+            entry
+            for author_id, users in followers.items()
+            for entry in entries(users, recipes.get(author_id, []))
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def unfollow(follow):
+    unfollow_authors(follow.user_id, [follow.author_id])
+
+
+def unfollow_authors(user_id, author_ids):
+    FeedEntry.objects.filter(user=user_id, author__in=author_ids).delete()
+
+
+def encode_cursor(position):
+    pub_date, recipe_id = position
+    return urlsafe_b64encode(
+        f'{pub_date.isoformat()}|{recipe_id}'.encode()
+    ).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        pub_date, recipe_id = urlsafe_b64decode(
+            cursor.encode()
+        ).decode().split('|')
+        return datetime.fromisoformat(pub_date), int(recipe_id)
+    except (DecodeError, UnicodeError, ValueError):
+        raise ValidationError({'cursor': 'Неверный курсор.'})
+
+
+def before(position, id_field):
+    pub_date, recipe_id = position
+    return Q(pub_date__lt=pub_date) | Q(
+        pub_date=pub_date, **{f'{id_field}__lt': recipe_id}
+    )
+
+
+def feed_page(user, cursor, size):
+    """Страница ленты: позиции (pub_date, id) рецептов и курсор дальше.
+
+    Рецепты обычных авторов читаются из FeedEntry, рецепты авторов
+    с большим числом подписчиков — из Recipe при чтении; оба источника
+    упорядочены по одному индексу и сливаются без сортировки.
+    """
+    size = min(size, MAX_PAGE_SIZE)
+    position = decode_cursor(cursor) if cursor else None
+    pushed = FeedEntry.objects.filter(user=user).order_by(
+        '-pub_date', '-recipe'
+    ).values_list('pub_date', 'recipe')
+    if position is not None:
+        pushed = pushed.filter(before(position, 'recipe'))
+    sources = [pushed[:size + 1]]
+    pulled_authors = list(
+        Follow.objects.filter(user=user, author__feed_pulled=True)
+        .values_list('author', flat=True)
+    )
+    if pulled_authors:
+        pulled = Recipe.objects.filter(
+            author__in=pulled_authors
+        ).order_by('-pub_date', '-id').values_list('pub_date', 'id')
+        if position is not None:
+            pulled = pulled.filter(before(position, 'id'))
+        sources.append(pulled[:size + 1])
+    rows = []
+    for row in merge(*sources, reverse=True):
+        if not rows or rows[-1] != row:
+            rows.append(row)
+    page = rows[:size]
+    next_cursor = encode_cursor(page[-1]) if len(rows) > size else None
+    return [recipe_id for _, recipe_id in page], next_cursor
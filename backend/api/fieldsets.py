@@ -0,0 +1,54 @@
+"""Выбор полей ответа параметрами ?fields= и ?omit=.
+
+fields — список полей через запятую или имя набора из Meta.field_sets
+сериализатора (например, fields=card), omit — поля, которые нужно убрать.
+Неизвестные имена пропускаются. Параметры действуют только на корневой
+сериализатор ответа: вложенные объекты отдаются целиком.
+"""
+from rest_framework.serializers import ListSerializer
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def names(request, param):
+    return [
+        name
+        for values in request.GET.getlist(param)
+        for name in values.split(',')
+        if name
+    ]
+
+
+def selected_fields(request, fields, field_sets):
+    """Поля из fields, выбранные параметрами запроса, в исходном порядке."""
+    requested = set()
+    for name in names(request, FIELDS_PARAM):
+        requested.update(field_sets.get(name, (name,)))
+    omitted = set(names(request, OMIT_PARAM))
+    return [
+        name for name in fields
+        if (not requested or name in requested) and name not in omitted
+    ]
+
+
+class SparseFieldsMixin:
+    """Оставляет в сериализаторе только поля, выбранные в запросе."""
+
+    def is_root(self):
+        parent = self.parent
+        if isinstance(parent, ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or not self.is_root():
+            return fields
+        return {
+            name: fields[name]
+            for name in selected_fields(
+                request, fields, getattr(self.Meta, 'field_sets', {})
+            )
+        }
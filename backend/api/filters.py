@@ -3,6 +3,16 @@ from django_filters.rest_framework import FilterSet, filters
 
 from recipes.models import Ingredient, Recipe, Tag
 
+RECIPE_ORDERINGS = {
+    'popular': ('-popular_score', '-id'),
+    'trending': ('-trending_score', '-id'),
+    'cooking_time': ('cooking_time', 'id'),
+    '-cooking_time': ('-cooking_time', '-id'),
+    'name': ('name', 'id'),
+    '-name': ('-name', '-id'),
+    'favorites': ('-favorites_count', '-id'),
+}
+
 
 class IngredientFilter(FilterSet):
     name = filters.CharFilter(
@@ -26,10 +36,23 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    cooking_time__gte = filters.NumberFilter(
+        field_name='cooking_time', lookup_expr='gte'
+    )
+    cooking_time__lte = filters.NumberFilter(
+        field_name='cooking_time', lookup_expr='lte'
+    )
+    ordering = filters.ChoiceFilter(
+        choices=[(ordering, ordering) for ordering in RECIPE_ORDERINGS],
+        method='filter_ordering',
+    )
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+            'cooking_time__gte', 'cooking_time__lte', 'ordering',
+        )
 
     def filter_is_favorited(self, recipes, name, value):
         user = (
@@ -51,6 +74,9 @@ class RecipeFilter(FilterSet):
             return recipes.filter(shoppinglists__user_id=user.id)
         return recipes
 
+    def filter_ordering(self, recipes, name, value):
+        return recipes.order_by(*RECIPE_ORDERINGS[value])
+
 
 class CookingTimeFilter(SimpleListFilter):
     title = 'Время приготовления'
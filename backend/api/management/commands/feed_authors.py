@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from api.feed import update_high_follower_authors
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает авторов, чьи рецепты подмешиваются в ленты при '
+        'чтении, и дополняет ленты рецептами выбывших; запускается '
+        'периодически'
+    )
+
+    def handle(self, *args, **options):
+        authors, dropped = update_high_follower_authors()
+        self.stdout.write(self.style.SUCCESS(
+            f'Авторов с подмешиванием рецептов: {authors}, '
+            f'выбыло: {dropped}.'
+        ))
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.models import RecipeChange
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из журнала изменений рецептов записи старше '
+        'CHANGES_RETENTION_DAYS дней; запускается периодически'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.CHANGES_RETENTION_DAYS
+        )
+
+    def handle(self, *args, **options):
+        deleted, _ = RecipeChange.objects.filter(
+            created_at__lt=timezone.now() - timedelta(days=options['days'])
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено записей журнала изменений: {deleted}.'
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from api.feed import backfill
+from recipes.models import FeedEntry, Follow
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет ленты подписчиков последними рецептами авторов, '
+        'на которых они подписаны'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Предварительно удалить все записи лент',
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            FeedEntry.objects.all().delete()
+        follows = Follow.objects.all()
+        for follow in follows.iterator():
+            backfill(follow)
+        self.stdout.write(self.style.SUCCESS(
+            f'Ленты заполнены: {follows.count()} подписок, '
+            f'{FeedEntry.objects.count()} записей.'
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.scores import refresh_scores
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает популярность рецептов по избранному и спискам '
+        'покупок; запускается периодически'
+    )
+
+    def handle(self, *args, **options):
+        scored = refresh_scores(timezone.now())
+        self.stdout.write(self.style.SUCCESS(
+            f'Популярность пересчитана, рецептов с активностью: {scored}.'
+        ))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from django.utils import timezone
+
+from api.similarity import rebuild
+from recipes.models import RecipeNeighbor
+
+NEIGHBORS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает похожие рецепты по продуктам и тегам; по умолчанию '
+        'только для рецептов, измененных после прошлого запуска'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать соседей всех рецептов',
+        )
+        parser.add_argument(
+            '--k', type=int, default=NEIGHBORS,
+            help='Сколько соседей хранить для рецепта',
+        )
+
+    def handle(self, *args, **options):
+        started = timezone.now()
+        since = None
+        if not options['full']:
+            since = RecipeNeighbor.objects.aggregate(
+                last=Max('computed_at')
+            )['last']
+        updated = rebuild(options['k'], started, since)
+        scope = f' (изменения после {since:%Y-%m-%d %H:%M})' if since else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'Соседи пересчитаны для {updated} рецептов{scope}.'
+        ))
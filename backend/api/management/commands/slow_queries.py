@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from api.querylog import REPORT_ORDERING, query_log
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет GET-запросы к API внутри процесса и выводит '
+        'самые затратные SQL-запросы по отпечаткам'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='+', help='Пути API, например /api/recipes/'
+        )
+        parser.add_argument(
+            '--user', help='Email пользователя, от имени которого запросы'
+        )
+        parser.add_argument('--repeat', type=int, default=1)
+        parser.add_argument(
+            '--order', choices=REPORT_ORDERING, default='total'
+        )
+        parser.add_argument('--limit', type=int, default=20)
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options['user']:
+            user = User.objects.get(email=options['user'])
+            token, _ = Token.objects.get_or_create(user=user)
+            headers['HTTP_AUTHORIZATION'] = f'Token {token.key}'
+        host = next(
+            (host for host in settings.ALLOWED_HOSTS if '*' not in host),
+            'localhost'
+        )
+        client = Client(HTTP_HOST=host.lstrip('.'), **headers)
+        query_log.reset()
+        for _ in range(options['repeat']):
+            for path in options['paths']:
+                response = client.get(path)
+                if response.status_code >= 400:
+                    self.stderr.write(self.style.ERROR(
+                        f'{path}: ответ {response.status_code}'
+                    ))
+        self.stdout.write(query_log.report(
+            options['order'], options['limit']
+        ))
@@ -0,0 +1,203 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+from django.http import HttpResponse
+from rest_framework.serializers import ListSerializer
+
+from api.renderers import ORJSONRenderer
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+TIMING_PHASES = ('db', 'serialize', 'render', 'compress')
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+current_timings = ContextVar('current_timings', default=None)
+
+
+class RequestTimings:
+    """Замеры одного запроса: SQL, сериализация, рендеринг, сжатие."""
+
+    def __init__(self, request):
+        self.request = request
+        self.resolved_route = None
+        self.query_count = 0
+        self.durations = dict.fromkeys(TIMING_PHASES, 0.0)
+        self.depth = dict.fromkeys(TIMING_PHASES, 0)
+
+    @property
+    def route(self):
+        if self.resolved_route is None:
+            match = getattr(self.request, 'resolver_match', None)
+            if match is None:
+                return None
+            self.resolved_route = route_name(self.request, match.func)
+        return self.resolved_route
+
+    def add(self, phase, duration):
+        self.durations[phase] += duration
+
+    def add_query(self, duration):
+        self.query_count += 1
+        self.durations['db'] += duration
+
+    def server_timing(self, total):
+        return ', '.join((
+            f'db;dur={self.durations["db"] * 1000:.2f};'
+            f'desc="{self.query_count} queries"',
+            f'serialize;dur={self.durations["serialize"] * 1000:.2f}',
+            f'render;dur={self.durations["render"] * 1000:.2f}',
+            f'compress;dur={self.durations["compress"] * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ))
+
+
+@contextmanager
+def measure(phase):
+    timings = current_timings.get()
+    if timings is None or timings.depth[phase]:
+        yield
+        return
+    timings.depth[phase] += 1
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        timings.depth[phase] -= 1
+        timings.add(phase, perf_counter() - start)
+
+
+class TimedDataMixin:
+    @property
+    def data(self):
+        with measure('serialize'):
+            return super().data
+
+
+class TimedListSerializer(TimedDataMixin, ListSerializer):
+    pass
+
+
+class TimedJSONRenderer(ORJSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with measure('render'):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+
+
+def route_name(request, view_func):
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    method = request.method.lower()
+    action = (getattr(view_func, 'actions', None) or {}).get(method, method)
+    return f'{view_class.__name__}.{action}'
+
+
+class LatencyHistogram:
+    """Гистограмма длительностей в формате Prometheus."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.queries = 0
+        self.durations = dict.fromkeys(TIMING_PHASES, 0.0)
+
+
+class MetricsRegistry:
+    """Агрегаты по маршрутам в пределах процесса-воркера."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.routes = {}
+        self.cache_results = {}
+
+    def observe_cache(self, cache, hit, count=1):
+        key = (cache, 'hit' if hit else 'miss')
+        with self.lock:
+            self.cache_results[key] = self.cache_results.get(key, 0) + count
+
+    def observe(self, route, total, timings):
+        with self.lock:
+            metrics = self.routes.get(route)
+            if metrics is None:
+                metrics = self.routes[route] = RouteMetrics()
+            metrics.latency.observe(total)
+            metrics.queries += timings.query_count
+            for phase, duration in timings.durations.items():
+                metrics.durations[phase] += duration
+
+    def render(self):
+        lines = [
+            '# HELP foodgram_request_duration_seconds '
+            'Request latency by viewset action.',
+            '# TYPE foodgram_request_duration_seconds histogram',
+        ]
+        with self.lock:
+            routes = sorted(self.routes.items())
+            for route, metrics in routes:
+                latency = metrics.latency
+                cumulative = 0
+                for bound, count in zip(
+                    latency.buckets + ('+Inf',), latency.counts
+                ):
+                    cumulative += count
+                    lines.append(
+                        'foodgram_request_duration_seconds_bucket'
+                        f'{{route="{route}",le="{bound}"}} {cumulative}'
+                    )
+                lines.append(
+                    'foodgram_request_duration_seconds_sum'
+                    f'{{route="{route}"}} {latency.sum}'
+                )
+                lines.append(
+                    'foodgram_request_duration_seconds_count'
+                    f'{{route="{route}"}} {latency.count}'
+                )
+            lines.append('# TYPE foodgram_db_queries_total counter')
+            lines.extend(
+                f'foodgram_db_queries_total{{route="{route}"}} '
+                f'{metrics.queries}'
+                for route, metrics in routes
+            )
+            for phase in TIMING_PHASES:
+                name = f'foodgram_{phase}_duration_seconds_total'
+                lines.append(f'# TYPE {name} counter')
+                lines.extend(
+                    f'{name}{{route="{route}"}} {metrics.durations[phase]}'
+                    for route, metrics in routes
+                )
+            lines.append('# TYPE foodgram_cache_requests_total counter')
+            lines.extend(
+                f'foodgram_cache_requests_total'
+                f'{{cache="{cache}",result="{result}"}} {count}'
+                for (cache, result), count in sorted(
+                    self.cache_results.items()
+                )
+            )
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def metrics(request):
+    return HttpResponse(
+        registry.render(), content_type=PROMETHEUS_CONTENT_TYPE
+    )
@@ -0,0 +1,129 @@
+from time import perf_counter
+
+from asgiref.sync import (
+    async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+)
+from django.http import HttpResponse
+
+from api.compression import compress_response
+from api.db_routers import (
+    SAFE_METHODS, can_read_from_replica, read_from_replica, stick_to_primary
+)
+from api.metrics import RequestTimings, current_timings, registry
+from api.profiling import PROFILERS, is_staff, requested_mode
+
+
+class SyncAndAsyncMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.handle(request)
+
+
+class ServerTimingMiddleware(SyncAndAsyncMiddleware):
+    """Заголовок Server-Timing и метрики по действиям вьюсетов."""
+
+    def handle(self, request):
+        timings = RequestTimings(request)
+        token = current_timings.set(timings)
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(response, timings, perf_counter() - start)
+
+    async def __acall__(self, request):
+        timings = RequestTimings(request)
+        token = current_timings.set(timings)
+        start = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(response, timings, perf_counter() - start)
+
+    def finish(self, response, timings, total):
+        response['Server-Timing'] = timings.server_timing(total)
+        registry.observe(timings.route or 'unresolved', total, timings)
+        return response
+
+
+class ProfilerMiddleware(SyncAndAsyncMiddleware):
+    """Профилирование запроса по заголовку X-Profile или ?_profile= .
+
+    Под ASGI профилировщик запускается в потоке sync_to_async, а
+    остальная цепочка вызывается из него через async_to_sync: синхронные
+    представления выполняются в том же потоке, и профилируется он, а не
+    поток цикла событий.
+    """
+
+    def handle(self, request):
+        mode = requested_mode(request)
+        if mode is None or not is_staff(request):
+            return self.get_response(request)
+        return self.profile(request, mode, self.get_response)
+
+    async def __acall__(self, request):
+        mode = requested_mode(request)
+        if mode is None or not await sync_to_async(is_staff)(request):
+            return await self.get_response(request)
+        return await sync_to_async(self.profile)(
+            request, mode, async_to_sync(self.get_response)
+        )
+
+    def profile(self, request, mode, get_response):
+        with PROFILERS[mode]() as profile:
+            response = get_response(request)
+        return self.profile_response(response, profile)
+
+    def profile_response(self, response, profile):
+        response.close()
+        return HttpResponse(
+            profile.output,
+            content_type='text/plain; charset=utf-8',
+            headers={'X-Profiled-Status': response.status_code},
+        )
+
+
+class ReplicaRoutingMiddleware(SyncAndAsyncMiddleware):
+    """Чтения в реплики и read-your-writes после записи клиента."""
+
+    def handle(self, request):
+        token = read_from_replica.set(can_read_from_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            read_from_replica.reset(token)
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        token = read_from_replica.set(can_read_from_replica(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_from_replica.reset(token)
+        return self.finish(request, response)
+
+    def finish(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            stick_to_primary(request, response)
+        return response
+
+
+class CompressionMiddleware(SyncAndAsyncMiddleware):
+    """gzip или brotli для ответов больше COMPRESSION_MIN_SIZE."""
+
+    def handle(self, request):
+        return compress_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return compress_response(request, await self.get_response(request))
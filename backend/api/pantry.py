@@ -0,0 +1,236 @@
+"""Поиск рецептов по продуктам, которые есть у пользователя.
+
+Инвертированный индекс в памяти процесса: для каждого продукта и тега —
+битовая карта id рецептов в виде целого числа Python, где бит n означает
+рецепт с id n; рецепты разложены по картам и по числу своих продуктов.
+Число имеющихся продуктов каждого рецепта считается сразу для всех
+рецептов побитовым сложением карт продуктов пользователя (разряды
+счетчика — тоже карты), поэтому Python не обходит рецепты по одному.
+Затем классы (есть продуктов, нужно продуктов) перебираются от лучшей
+доли к худшей, пока не наберется limit рецептов. Под блокировкой индекс
+только обновляется и отдает нужные карты; ранжирование идет без нее.
+Индекс строится при первом запросе и догружает измененные рецепты, когда
+меняется поколение рецептов в общем кеше.
+"""
+from datetime import timedelta
+from itertools import groupby
+from threading import Lock
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Prefetch
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from recipes.generations import RECIPES, get_generations
+from recipes.models import Recipe, RecipeIngredient
+
+REFRESH_OVERLAP = timedelta(minutes=1)
+
+
+def highest_ids(bitmap, limit):
+    """До limit id из карты от большего к меньшему."""
+    ids = []
+    while bitmap and len(ids) < limit:
+        recipe_id = bitmap.bit_length() - 1
+        ids.append(recipe_id)
+        bitmap ^= 1 << recipe_id
+    return ids
+
+
+def bit_counters(bitmaps):
+    """Разряды числа карт, в которых есть каждый бит: младший первым."""
+    counters = []
+    for bitmap in bitmaps:
+        carry = bitmap
+        for level, counter in enumerate(counters):
+            counters[level], carry = counter ^ carry, counter & carry
+            if not carry:
+                break
+        if carry:
+            counters.append(carry)
+    return counters
+
+
+def class_rank(match_class):
+    """Доля имеющихся продуктов, затем минус число недостающих.
+
+    Равны только классы с полным набором продуктов: их рецепты
+    упорядочиваются вместе по id.
+    """
+    owned, required = match_class
+    return owned / required, owned - required
+
+
+def count_equals(counters, count, candidates):
+    """Биты candidates, у которых счетчик равен count."""
+    if count >> len(counters):
+        return 0
+    for level, counter in enumerate(counters):
+        candidates &= counter if count >> level & 1 else ~counter
+    return candidates
+
+
+class PantryIndex:
+    def __init__(self):
+        self.lock = Lock()
+        self.ingredients = {}
+        self.tags = {}
+        self.sizes = {}
+        self.recipes = {}
+        self.generation = None
+        self.refreshed_at = None
+
+    def recipes_with_relations(self, queryset):
+        return queryset.only('id').prefetch_related(
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.only(
+                    'recipe_id', 'ingredient_id'
+                ),
+            ),
+            'tags',
+        )
+
+    def add(self, recipe_id, ingredient_ids, tag_ids):
+        bit = 1 << recipe_id
+        for ingredient_id in ingredient_ids:
+            self.ingredients[ingredient_id] = (
+                self.ingredients.get(ingredient_id, 0) | bit
+            )
+        for tag_id in tag_ids:
+            self.tags[tag_id] = self.tags.get(tag_id, 0) | bit
+        ingredient_ids = frozenset(ingredient_ids)
+        size = len(ingredient_ids)
+        self.sizes[size] = self.sizes.get(size, 0) | bit
+        self.recipes[recipe_id] = (ingredient_ids, tag_ids)
+
+    def remove(self, recipe_id):
+        entry = self.recipes.pop(recipe_id, None)
+        if entry is None:
+            return
+        mask = ~(1 << recipe_id)
+        for ingredient_id in entry[0]:
+            self.ingredients[ingredient_id] &= mask
+        for tag_id in entry[1]:
+            self.tags[tag_id] &= mask
+        self.sizes[len(entry[0])] &= mask
+
+    def load(self, queryset):
+        for recipe in self.recipes_with_relations(queryset):
+            self.remove(recipe.id)
+            self.add(
+                recipe.id,
+                [
+                    recipe_ingredient.ingredient_id
+                    for recipe_ingredient in recipe.recipe_ingredients.all()
+                ],
+                [tag.id for tag in recipe.tags.all()],
+            )
+
+    def refresh(self):
+        """Догружает рецепты, измененные с прошлого обновления.
+
+        Окно захватывает минуту до прошлого обновления, чтобы не пропустить
+        транзакции, закоммиченные позже выставленного в них updated_at.
+        Удаленные рецепты убираются при выдаче результатов. Читает из
+        primary: отставшая реплика не должна попасть в индекс под новым
+        поколением.
+        """
+        generation = get_generations((RECIPES,))
+        if generation == self.generation:
+            return
+        started = timezone.now()
+        queryset = Recipe.objects.using(DEFAULT_DB_ALIAS)
+        if self.refreshed_at is not None:
+            queryset = queryset.filter(
+                updated_at__gte=self.refreshed_at - REFRESH_OVERLAP
+            )
+        self.load(queryset)
+        self.generation = generation
+        self.refreshed_at = started
+
+    def snapshot(self, ingredient_ids, tag_ids):
+        """Обновляет индекс и отдает карты, нужные для поиска.
+
+        Карты — неизменяемые целые, поэтому после выхода из блокировки
+        их не меняет параллельное обновление индекса.
+        """
+        with self.lock:
+            self.refresh()
+            return (
+                [self.ingredients.get(pk, 0) for pk in ingredient_ids],
+                None if tag_ids is None else [
+                    self.tags.get(pk, 0) for pk in tag_ids
+                ],
+                dict(self.sizes),
+            )
+
+    def search(self, ingredient_ids, tag_ids=None, limit=10):
+        """Top-k рецептов по доле продуктов рецепта, которые уже есть.
+
+        Возвращает кортежи (id рецепта, есть продуктов, нужно продуктов);
+        при равной доле выше рецепты с меньшим числом недостающих, затем
+        с большим id.
+        """
+        ingredients, tags, sizes = self.snapshot(
+            frozenset(ingredient_ids), tag_ids
+        )
+        counters = bit_counters(ingredients)
+        candidates = 0
+        for counter in counters:
+            candidates |= counter
+        if tags is not None:
+            tagged = 0
+            for bitmap in tags:
+                tagged |= bitmap
+            candidates &= tagged
+        classes = sorted(
+            (
+                (owned, required)
+                for required, bitmap in sizes.items()
+                if bitmap & candidates
+                for owned in range(1, required + 1)
+            ),
+            key=class_rank,
+            reverse=True,
+        )
+        matches = []
+        by_count = {}
+        for _, group in groupby(classes, key=class_rank):
+            need = limit - len(matches)
+            if need <= 0:
+                break
+            found = []
+            for owned, required in group:
+                if owned not in by_count:
+                    by_count[owned] = count_equals(
+                        counters, owned, candidates
+                    )
+                found.extend(
+                    (recipe_id, owned, required)
+                    for recipe_id in highest_ids(
+                        by_count[owned] & sizes[required], need
+                    )
+                )
+            matches.extend(sorted(found, reverse=True)[:need])
+        return matches
+
+    def discard(self, recipe_ids):
+        with self.lock:
+            for recipe_id in recipe_ids:
+                self.remove(recipe_id)
+
+
+pantry_index = PantryIndex()
+
+
+def id_list(request, name):
+    try:
+        return [
+            int(value)
+            for values in request.query_params.getlist(name)
+            for value in values.split(',')
+            if value
+        ]
+    except ValueError:
+        raise ValidationError({name: 'Ожидаются целые id через запятую.'})
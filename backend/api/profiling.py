@@ -0,0 +1,151 @@
+import cProfile
+import pstats
+import sys
+import threading
+from collections import Counter
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAM = '_profile'
+PROFILE_MODES = ('cprofile', 'sample')
+MIN_STACK_MICROSECONDS = 1
+SAMPLE_INTERVAL = 0.001
+
+
+def requested_mode(request):
+    mode = request.META.get(PROFILE_HEADER)
+    if mode is None and PROFILE_PARAM in request.META.get('QUERY_STRING', ''):
+        mode = request.GET.get(PROFILE_PARAM)
+    return mode if mode in PROFILE_MODES else None
+
+
+def is_staff(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    try:
+        credentials = TokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return credentials is not None and credentials[0].is_staff
+
+
+def frame_name(filename, lineno, name):
+    return f'{name} ({filename}:{lineno})'
+
+
+class CProfileProfiler:
+    """Детерминированный профиль cProfile в формате collapsed stacks.
+
+    cProfile хранит время по парам вызывающий -> вызываемый, а не по
+    полным стекам. Стеки строятся обходом от корней — функций, которые
+    вызывались из кода, начатого до включения профиля: время вызываемой
+    функции делится между путями к ней пропорционально времени вызова
+    с каждого пути. Число у стека — собственное время в микросекундах,
+    стеки короче MIN_STACK_MICROSECONDS отбрасываются.
+    """
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.output = ''
+
+    def __enter__(self):
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.disable()
+        self.output = '\n'.join(
+            f'{stack} {count}'
+            for stack, count in self.collapsed_stacks().items()
+        )
+
+    def collapsed_stacks(self):
+        stats = pstats.Stats(self.profiler).stats
+        callees = {}
+        for function, (*_, callers) in stats.items():
+            for caller, (_, _, _, cumulative) in callers.items():
+                callees.setdefault(caller, {})[function] = cumulative
+        stacks = Counter()
+        pending = [
+            (function, (function,), stats[function][3])
+            for function, (_, calls, _, _, callers) in stats.items()
+            if calls > sum(edge[1] for edge in callers.values())
+        ]
+        while pending:
+            function, path, cumulative = pending.pop()
+            _, _, own, total, _ = stats[function]
+            share = cumulative / total if total else 0
+            microseconds = round(own * share * 1000000)
+            if microseconds >= MIN_STACK_MICROSECONDS:
+                stacks[';'.join(frame_name(*frame) for frame in path)] += (
+                    microseconds
+                )
+            for callee, callee_cumulative in callees.get(
+                function, {}
+            ).items():
+                if callee in path or callee not in stats:
+                    continue
+                if callee_cumulative * share * 1000000 >= (
+                    MIN_STACK_MICROSECONDS
+                ):
+                    pending.append(
+                        (callee, path + (callee,), callee_cumulative * share)
+                    )
+        return stacks
+
+
+class StackSampler(threading.Thread):
+    """Периодически снимает стек потока, обрабатывающего запрос."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(frame_name(
+                    code.co_filename, frame.f_lineno, code.co_name
+                ))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+
+class SamplingProfiler:
+    """Сэмплирующий профиль в формате collapsed stacks.
+
+    Снимает стек потока, в котором вошли в профилировщик.
+    """
+
+    def __init__(self):
+        self.sampler = None
+        self.output = ''
+
+    def __enter__(self):
+        self.sampler = StackSampler(threading.get_ident())
+        self.sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.sampler.stopped.set()
+        self.sampler.join()
+        self.output = '\n'.join(
+            f'{stack} {count}'
+            for stack, count in self.sampler.stacks.items()
+        )
+
+
+PROFILERS = {
+    'cprofile': CProfileProfiler,
+    'sample': SamplingProfiler,
+}
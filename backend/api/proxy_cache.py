@@ -0,0 +1,114 @@
+import logging
+import threading
+import time
+from urllib.error import HTTPError, URLError
+from urllib.request import HTTPRedirectHandler, Request, build_opener
+
+from django.conf import settings
+
+from recipes.short_links import encode
+
+REFRESH_HEADER = 'X-Cache-Refresh'
+REFRESH_TIMEOUT = 2
+# Сколько ждать новых путей перед отправкой накопленных.
+REFRESH_DELAY = 0.5
+# Варианты ответа в кеше nginx: его ключ включает выбранное сжатие.
+REFRESH_ENCODINGS = ('', 'gzip', 'br')
+RECIPE_PATHS = (
+    '/api/recipes/{id}/',
+    '/api/recipes/{id}/get-link/',
+    '/s/{id}/',
+    '/s/c/{code}/',
+)
+
+logger = logging.getLogger(__name__)
+
+
+class NoRedirect(HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+opener = build_opener(NoRedirect)
+
+
+class RefreshQueue:
+    """Пути для обновления, отправляемые пачками одним фоновым потоком.
+
+    Поток запускается первым добавленным путем, ждет REFRESH_DELAY и
+    отправляет все накопленные к этому времени пути, каждый один раз.
+    Сохранения рецепта, его продуктов и тегов в одной транзакции и серии
+    изменений подряд дают один набор запросов, а не поток на каждое.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.paths = {}
+        self.sender = None
+
+    def add(self, paths):
+        with self.lock:
+            self.paths.update(dict.fromkeys(paths))
+            if self.sender is None:
+                self.sender = threading.Thread(target=self.send, daemon=True)
+                self.sender.start()
+
+    def send(self):
+        time.sleep(REFRESH_DELAY)
+        with self.lock:
+            paths, self.paths = list(self.paths), {}
+            self.sender = None
+        send_refreshes(paths)
+
+
+refresh_queue = RefreshQueue()
+
+
+def refresh_paths(paths):
+    """Перезапрашивает страницы через nginx в обход его кеша.
+
+    nginx пропускает чтение кеша для запросов с верным ключом в заголовке
+    X-Cache-Refresh и сохраняет свежий ответ под тем же ключом. Запросы
+    отправляются из фонового потока RefreshQueue, чтобы не задерживать
+    ответ клиенту. Без PROXY_CACHE_REFRESH_KEY обновление отключено.
+    """
+    if (
+        not settings.PROXY_CACHE_URL
+        or not settings.PROXY_CACHE_REFRESH_KEY
+        or not paths
+    ):
+        return
+    refresh_queue.add(paths)
+
+
+def send_refreshes(paths):
+    for host in settings.PROXY_CACHE_HOSTS:
+        for path in paths:
+            for encoding in REFRESH_ENCODINGS:
+                refresh(host, path, encoding)
+
+
+def refresh(host, path, encoding):
+    request = Request(
+        settings.PROXY_CACHE_URL + path,
+        headers={
+            'Host': host,
+            'Accept-Encoding': encoding,
+            REFRESH_HEADER: settings.PROXY_CACHE_REFRESH_KEY,
+        },
+    )
+    try:
+        opener.open(request, timeout=REFRESH_TIMEOUT).close()
+    except HTTPError as error:
+        error.close()
+    except (URLError, OSError) as error:
+        logger.warning(
+            'Не удалось обновить %s%s в кеше nginx: %s', host, path, error,
+        )
+
+
+def recipe_paths(recipe_id):
+    return [
+        path.format(id=recipe_id, code=encode(recipe_id))
+        for path in RECIPE_PATHS
+    ] + list(settings.PROXY_CACHE_LIST_PATHS)
@@ -0,0 +1,157 @@
+import logging
+import os
+import re
+import sys
+from collections import Counter, deque
+from functools import lru_cache
+from math import ceil
+from threading import Lock
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
+
+from api import metrics, middleware
+from api.metrics import current_timings
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_SIZE = 1000
+MAX_FINGERPRINTS = 2000
+REPORT_ORDERING = ('total', 'count', 'p99')
+INSTRUMENTATION_FILES = {__file__, metrics.__file__, middleware.__file__}
+ORM_PATH = os.path.join(os.sep, 'django', 'db', '')
+SITE_PACKAGES = os.path.join('site-packages', '')
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+VALUE_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+WHITESPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    sql = LITERALS.sub('?', sql)
+    sql = VALUE_LISTS.sub('(...)', sql)
+    return WHITESPACE.sub(' ', sql).strip()
+
+
+def call_site():
+    project_root = str(settings.BASE_DIR)
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (
+            filename not in INSTRUMENTATION_FILES
+            and ORM_PATH not in filename
+        ):
+            if SITE_PACKAGES in filename:
+                filename = filename.split(SITE_PACKAGES, 1)[1]
+            elif filename.startswith(project_root):
+                filename = filename[len(project_root) + 1:]
+            return f'{filename}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return '-'
+
+
+def current_route(timings):
+    if timings is None:
+        return '-'
+    return timings.route or 'unresolved'
+
+
+class FingerprintStats:
+    """Агрегат по нормализованному SQL-запросу."""
+
+    def __init__(self, fingerprint, call_site):
+        self.fingerprint = fingerprint
+        self.call_site = call_site
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+        self.routes = Counter()
+
+    @property
+    def p99(self):
+        ordered = sorted(self.samples)
+        return ordered[max(ceil(len(ordered) * 0.99) - 1, 0)]
+
+
+class QueryLog:
+    """Обертка execute_wrapper: статистика и журнал медленных запросов."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.stats = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, perf_counter() - start)
+
+    def record(self, sql, duration):
+        key = fingerprint(sql)
+        timings = current_timings.get()
+        if timings is not None:
+            timings.add_query(duration)
+        route = current_route(timings)
+        slow = duration * 1000 >= settings.SLOW_QUERY_MS
+        site = call_site() if slow or key not in self.stats else None
+        with self.lock:
+            stats = self.stats.get(key)
+            if stats is None and len(self.stats) < MAX_FINGERPRINTS:
+                stats = self.stats[key] = FingerprintStats(
+                    key, site or call_site()
+                )
+            if stats is not None:
+                stats.count += 1
+                stats.total += duration
+                stats.samples.append(duration)
+                stats.routes[route] += 1
+        if slow:
+            logger.warning(
+                'Медленный запрос %.1f мс (%s, %s): %s',
+                duration * 1000, route, site, sql
+            )
+
+    def reset(self):
+        with self.lock:
+            self.stats.clear()
+
+    def top(self, ordering='total', limit=20):
+        with self.lock:
+            stats = list(self.stats.values())
+        return sorted(
+            stats, key=lambda item: getattr(item, ordering), reverse=True
+        )[:limit]
+
+    def report(self, ordering='total', limit=20):
+        lines = []
+        for stats in self.top(ordering, limit):
+            route, _ = stats.routes.most_common(1)[0]
+            lines.append(
+                f'{stats.count:>8} запр. {stats.total * 1000:>10.1f} мс '
+                f'p99 {stats.p99 * 1000:>8.2f} мс  {route}  '
+                f'{stats.call_site}\n    {stats.fingerprint}'
+            )
+        return '\n'.join(lines)
+
+
+query_log = QueryLog()
+
+
+def install_query_log(sender, connection, **kwargs):
+    if query_log not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, query_log)
+
+
+@staff_member_required
+def slow_queries(request):
+    ordering = request.GET.get('o', 'total')
+    if ordering not in REPORT_ORDERING:
+        ordering = 'total'
+    return HttpResponse(
+        query_log.report(ordering), content_type='text/plain; charset=utf-8'
+    )
@@ -0,0 +1,75 @@
+"""Журнал изменений рецептов (outbox) и чтение его по курсору.
+
+Записи добавляются сигналами и сериализатором рецепта в той же
+транзакции, что и само изменение, поэтому откаченное изменение не
+попадает в журнал. id записей выдаются при вставке, а видны после
+коммита: транзакция с меньшим id может закоммититься позже большей.
+Поэтому отдаются только записи старше CHANGES_SETTLE_SECONDS: курсор
+не перескочит запись транзакции, которая длилась меньше этого срока.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from recipes.models import RecipeChange
+
+CHANGES_LIMIT = 500
+CHANGES_MAX_LIMIT = 1000
+
+
+def record(recipe_ids, operation=RecipeChange.UPSERT):
+    RecipeChange.objects.bulk_create([
+        RecipeChange(recipe_id=recipe_id, operation=operation)
+        for recipe_id in dict.fromkeys(recipe_ids)
+    ])
+
+
+def settled():
+    return RecipeChange.objects.filter(
+        created_at__lte=timezone.now() - timedelta(
+            seconds=settings.CHANGES_SETTLE_SECONDS
+        )
+    )
+
+
+def changes_page(since, limit):
+    """Изменения после курсора since: последняя операция по рецепту.
+
+    Если since старше самых старых записей, удаленных при очистке
+    журнала, возвращает reset: клиент загружает рецепты заново
+    и продолжает с выданного курсора.
+    """
+    changes = settled()
+    first = RecipeChange.objects.order_by('id').values_list(
+        'id', flat=True
+    ).first()
+    if first is not None and since < first - 1:
+        return {
+            'reset': True,
+            'cursor': str(
+                changes.order_by('-id').values_list('id', flat=True).first()
+                or since
+            ),
+            'has_more': False,
+            'changes': [],
+        }
+    rows = list(
+        changes.filter(id__gt=since).order_by('id')
+        .values_list('id', 'recipe_id', 'operation')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    latest = {}
+    for change_id, recipe_id, operation in rows:
+        latest.pop(recipe_id, None)
+        latest[recipe_id] = operation
+    return {
+        'reset': False,
+        'cursor': str(rows[-1][0] if rows else since),
+        'has_more': has_more,
+        'changes': [
+            {'id': recipe_id, 'op': operation}
+            for recipe_id, operation in latest.items()
+        ],
+    }
@@ -0,0 +1,118 @@
+"""Представления рецептов для списков без ModelSerializer.
+
+Списки читают рецепты строками values_list (recipe_rows), а
+recipe_payloads собирает из них и из словарей тегов, продуктов и авторов
+те же словари, что RecipeReadSerializer: без экземпляров моделей и без
+вызова объектов полей для каждого рецепта. Порядок ключей берется из
+объявлений полей сериализатора, значения заполняются здесь; флаги
+пользователя остаются False и накладываются потом, как для кеша
+представлений. Совпадение с сериализатором проверяет api.tests.
+"""
+from collections import defaultdict
+
+from recipes.models import (
+    Ingredient, ProjectUser, Recipe, RecipeIngredient, Tag
+)
+
+USER_FLAG_FIELDS = ('is_favorited', 'is_in_shopping_cart')
+AUTHOR_COMPUTED_FIELDS = ('is_subscribed', 'avatar')
+RECIPE_COLUMNS = (
+    'id', 'author_id', 'name', 'text', 'cooking_time', 'image', 'updated_at'
+)
+
+
+def recipe_rows(queryset):
+    """Рецепты queryset именованными кортежами с полями RECIPE_COLUMNS."""
+    return queryset.values_list(*RECIPE_COLUMNS, named=True)
+
+
+def file_url(request, field, name):
+    if not name:
+        return None
+    return request.build_absolute_uri(field.storage.url(name))
+
+
+def recipe_tags(recipe_ids, keys):
+    tags = defaultdict(list)
+    for recipe_id, *values in Tag.objects.filter(
+        recipes__in=recipe_ids
+    ).values_list('recipes', *keys):
+        tags[recipe_id].append(dict(zip(keys, values)))
+    return tags
+
+
+def recipe_ingredients(recipe_ids, keys):
+    rows = list(
+        RecipeIngredient.objects.filter(recipe__in=recipe_ids)
+        .values_list('recipe', 'ingredient', 'amount')
+    )
+    ingredients = {
+        values[0]: dict(zip(('id', 'name', 'measurement_unit'), values))
+        for values in Ingredient.objects.filter(
+            id__in={ingredient_id for _, ingredient_id, _ in rows}
+        ).values_list('id', 'name', 'measurement_unit')
+    }
+    payloads = defaultdict(list)
+    for recipe_id, ingredient_id, amount in rows:
+        ingredient = {**ingredients[ingredient_id], 'amount': amount}
+        payloads[recipe_id].append({key: ingredient[key] for key in keys})
+    return payloads
+
+
+def recipe_authors(author_ids, keys, request):
+    columns = [key for key in keys if key not in AUTHOR_COMPUTED_FIELDS]
+    avatar_field = ProjectUser._meta.get_field('avatar')
+    authors = {}
+    for author_id, *values, avatar in ProjectUser.objects.filter(
+        id__in=author_ids
+    ).values_list('id', *columns, 'avatar'):
+        author = dict(zip(columns, values))
+        author['is_subscribed'] = False
+        author['avatar'] = file_url(request, avatar_field, avatar)
+        authors[author_id] = {key: author[key] for key in keys}
+    return authors
+
+
+def recipe_payloads(serializer, recipes):
+    """Представления строк recipe_rows для полей, выбранных в serializer."""
+    fields = serializer.fields
+    request = serializer.context['request']
+    recipe_ids = [recipe.id for recipe in recipes]
+    tags = ingredients = authors = None
+    if 'tags' in fields:
+        tags = recipe_tags(recipe_ids, list(fields['tags'].child.fields))
+    if 'ingredients' in fields:
+        ingredients = recipe_ingredients(
+            recipe_ids, list(fields['ingredients'].child.fields)
+        )
+    if 'author' in fields:
+        authors = recipe_authors(
+            {recipe.author_id for recipe in recipes},
+            list(fields['author'].fields),
+            request,
+        )
+    image_field = Recipe._meta.get_field('image')
+    payloads = []
+    for recipe in recipes:
+        values = {
+            'id': recipe.id,
+            'name': recipe.name,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+        }
+        payload = {}
+        for name in fields:
+            if name == 'tags':
+                payload[name] = tags[recipe.id]
+            elif name == 'ingredients':
+                payload[name] = ingredients[recipe.id]
+            elif name == 'author':
+                payload[name] = authors[recipe.author_id]
+            elif name == 'image':
+                payload[name] = file_url(request, image_field, recipe.image)
+            elif name in USER_FLAG_FIELDS:
+                payload[name] = False
+            else:
+                payload[name] = values[name]
+        payloads.append(payload)
+    return payloads
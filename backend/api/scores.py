@@ -0,0 +1,69 @@
+"""Популярность рецептов с экспоненциальным затуханием.
+
+Каждое добавление в избранное или в список покупок дает вклад
+weight * 2 ** (-возраст / период полураспада). popular_score считается
+с долгим периодом, trending_score — с коротким, поэтому второй быстро
+поднимает рецепты, которые добавляют прямо сейчас.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+
+from recipes.generations import SCORES, bump
+from recipes.models import Favorite, Recipe, ShoppingList
+
+POPULAR_HALF_LIFE = timedelta(days=30)
+TRENDING_HALF_LIFE = timedelta(days=2)
+TRENDING_WINDOW = TRENDING_HALF_LIFE * 10
+ACTIVITY_WEIGHTS = (
+    (Favorite, 1.0),
+    (ShoppingList, 0.5),
+)
+BATCH_SIZE = 1000
+
+
+def decayed(age, half_life):
+    return 2 ** (-age / half_life)
+
+
+def compute_scores(now):
+    popular = defaultdict(float)
+    trending = defaultdict(float)
+    for model, weight in ACTIVITY_WEIGHTS:
+        for recipe_id, created_at in model.objects.values_list(
+            'recipe', 'created_at'
+        ).iterator():
+            age = now - created_at
+            popular[recipe_id] += weight * decayed(age, POPULAR_HALF_LIFE)
+            if age < TRENDING_WINDOW:
+                trending[recipe_id] += weight * decayed(
+                    age, TRENDING_HALF_LIFE
+                )
+    return popular, trending
+
+
+@transaction.atomic
+def save_scores(popular, trending):
+    Recipe.objects.exclude(popular_score=0, trending_score=0).update(
+        popular_score=0, trending_score=0
+    )
+    Recipe.objects.bulk_update(
+        [
+            Recipe(
+                id=recipe_id,
+                popular_score=score,
+                trending_score=trending.get(recipe_id, 0),
+            )
+            for recipe_id, score in popular.items()
+        ],
+        ('popular_score', 'trending_score'),
+        batch_size=BATCH_SIZE,
+    )
+    transaction.on_commit(lambda: bump(SCORES))
+
+
+def refresh_scores(now):
+    popular, trending = compute_scores(now)
+    save_scores(popular, trending)
+    return len(popular)
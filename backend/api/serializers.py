@@ -2,10 +2,23 @@ import base64
 
 from django.contrib.auth import get_user_model
 from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Manager
 from djoser.serializers import UserSerializer
 from rest_framework import serializers
 
-from recipes.constants import (INGREDIENT_AMOUNT_MIN, COOKING_TIME_MIN)
+from api import recipe_changes
+from api.cache import recipe_fragments
+from api.fieldsets import SparseFieldsMixin
+from api.metrics import TimedDataMixin, TimedListSerializer
+from api.signals import bulk_change
+from api.user_flags import (
+    FAVORITE, SHOPPING_CART, SUBSCRIPTION, UserFlags
+)
+from recipes.constants import (
+    BULK_MAX_IDS, INGREDIENT_AMOUNT_MIN, COOKING_TIME_MIN,
+    SUBSCRIPTION_RECIPES_LIMIT
+)
 from recipes.models import (
     Favorite, Ingredient, Recipe,
     RecipeIngredient, ShoppingList, Tag
@@ -13,6 +26,16 @@ from recipes.models import (
 
 User = get_user_model()
 
+RECIPE_PREFETCH = {
+    'tags': 'tags',
+    'ingredients': 'recipe_ingredients__ingredient',
+}
+RECIPE_FLAGS = {
+    'is_favorited': FAVORITE,
+    'is_in_shopping_cart': SHOPPING_CART,
+    'author': SUBSCRIPTION,
+}
+
 
 class Base64ImageField(serializers.ImageField):
     def to_internal_value(self, data):
@@ -23,17 +46,23 @@ class Base64ImageField(serializers.ImageField):
         return super().to_internal_value(data)
 
 
-class ProjectUserSerializer(UserSerializer):
+class ProjectUserSerializer(
+    SparseFieldsMixin, TimedDataMixin, UserSerializer
+):
     is_subscribed = serializers.SerializerMethodField()
     avatar = Base64ImageField(allow_null=True, required=False)
 
     class Meta(UserSerializer.Meta):
         fields = UserSerializer.Meta.fields + ('is_subscribed', 'avatar')
+        list_serializer_class = TimedListSerializer
 
     def get_is_subscribed(self, author):
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
+        user_flags = self.context.get('user_flags')
+        if user_flags is not None:
+            return author.id in user_flags.subscribed
         return request.user.followers.filter(author=author).exists()
 
 
@@ -45,16 +74,18 @@ class AvatarSerializer(serializers.ModelSerializer):
         fields = ('avatar',)
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedDataMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ('id', 'name', 'slug',)
+        list_serializer_class = TimedListSerializer
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedDataMixin, serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = ('id', 'name', 'measurement_unit',)
+        list_serializer_class = TimedListSerializer
 
 
 class RecipeIngredientSerializer(serializers.ModelSerializer):
@@ -78,7 +109,25 @@ class RecipeIngredientWriteSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount')
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeListSerializer(TimedListSerializer):
+
+    def to_representation(self, data):
+        recipes = list(data.all() if isinstance(data, Manager) else data)
+        request = self.context.get('request')
+        if request is None:
+            return super().to_representation(recipes)
+        if 'user_flags' not in self.context:
+            self.context['user_flags'] = UserFlags.load(
+                request.user, recipes, self.child.flag_kinds()
+            )
+        return recipe_fragments.represent(
+            self.child, recipes, self.context['user_flags']
+        )
+
+
+class RecipeReadSerializer(
+    SparseFieldsMixin, TimedDataMixin, serializers.ModelSerializer
+):
     tags = TagSerializer(many=True)
     author = ProjectUserSerializer()
     ingredients = RecipeIngredientSerializer(
@@ -95,21 +144,44 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'name', 'image', 'text',
             'cooking_time',
         )
+        field_sets = {
+            'card': (
+                'id', 'tags', 'author', 'is_favorited',
+                'is_in_shopping_cart', 'name', 'image', 'cooking_time',
+            ),
+        }
+        list_serializer_class = RecipeListSerializer
+
+    def prefetch_lookups(self):
+        """Связи, которые нужно подгрузить для выбранных полей."""
+        return [
+            lookup for name, lookup in RECIPE_PREFETCH.items()
+            if name in self.fields
+        ]
 
-    def check_user_status(self, recipe, model_class):
+    def flag_kinds(self):
+        """Флаги UserFlags, которые нужны выбранным полям."""
+        return [
+            kind for name, kind in RECIPE_FLAGS.items() if name in self.fields
+        ]
+
+    def check_user_status(self, recipe, model_class, flag):
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return False
+        user_flags = self.context.get('user_flags')
+        if user_flags is not None:
+            return recipe.id in user_flags.ids[flag]
         return model_class.objects.filter(
             recipe=recipe,
             user=request.user
         ).exists()
 
     def get_is_favorited(self, recipe):
-        return self.check_user_status(recipe, Favorite)
+        return self.check_user_status(recipe, Favorite, FAVORITE)
 
     def get_is_in_shopping_cart(self, recipe):
-        return self.check_user_status(recipe, ShoppingList)
+        return self.check_user_status(recipe, ShoppingList, SHOPPING_CART)
 
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
@@ -167,29 +239,43 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         ]
         RecipeIngredient.objects.bulk_create(recipe_ingredients)
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
-        recipe = super().create(validated_data)
-        self.create_tags(tags, recipe)
-        self.create_ingredients(ingredients, recipe)
+        token = bulk_change.set(True)
+        try:
+            recipe = super().create(validated_data)
+            self.create_tags(tags, recipe)
+            self.create_ingredients(ingredients, recipe)
+        finally:
+            bulk_change.reset(token)
+        recipe_changes.record([recipe.id])
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        self.create_tags(validated_data.pop('tags'), instance)
-        self.create_ingredients(self.validate_ingredients(
-            validated_data.pop('ingredients')), instance
-        )
-        return super().update(instance, validated_data)
+        token = bulk_change.set(True)
+        try:
+            RecipeIngredient.objects.filter(recipe=instance).delete()
+            self.create_tags(validated_data.pop('tags'), instance)
+            self.create_ingredients(self.validate_ingredients(
+                validated_data.pop('ingredients')), instance
+            )
+            recipe = super().update(instance, validated_data)
+        finally:
+            bulk_change.reset(token)
+        recipe_changes.record([recipe.id])
+        return recipe
 
 
-class ShortRecipeSerializer(serializers.ModelSerializer):
+class ShortRecipeSerializer(TimedDataMixin, serializers.ModelSerializer):
     image = Base64ImageField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
+        list_serializer_class = TimedListSerializer
 
 
 class SubscriberDetailSerializer(ProjectUserSerializer):
@@ -203,12 +289,26 @@ class SubscriberDetailSerializer(ProjectUserSerializer):
         )
         read_only_fields = ('recipes', 'recipes_count',)
 
+    @staticmethod
+    def recipes_limit(request):
+        """recipes_limit запроса, без него — SUBSCRIPTION_RECIPES_LIMIT."""
+        recipes_limit = request.GET.get('recipes_limit', '')
+        if recipes_limit.isdigit():
+            return int(recipes_limit)
+        return SUBSCRIPTION_RECIPES_LIMIT
+
     def get_recipes(self, subscriber):
         request = self.context.get('request')
         return ShortRecipeSerializer(
-            subscriber.recipes.all()[:int(
-                request.GET.get('recipes_limit', 10**10)
-            )],
+            subscriber.recipes.all()[:self.recipes_limit(request)],
             many=True,
             context={'request': request}
         ).data
+
+
+class BulkIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_MAX_IDS,
+    )
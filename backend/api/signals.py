@@ -0,0 +1,184 @@
+from contextvars import ContextVar
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F, QuerySet
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete
+)
+from django.dispatch import receiver
+
+from api import recipe_changes
+from api.feed import backfill, fan_out, unfollow
+from api.proxy_cache import recipe_paths, refresh_paths
+from api.user_state import MODEL_KINDS, record_changes
+from recipes.generations import INGREDIENTS, RECIPES, TAGS, USERS, bump
+from recipes.models import (
+    Favorite, Follow, Ingredient, ProjectUser, Recipe, RecipeChange,
+    RecipeIngredient, ShoppingList, Tag
+)
+from recipes.short_links import recipe_ids
+
+GENERATIONS = {
+    Recipe: RECIPES,
+    RecipeIngredient: RECIPES,
+    Recipe.tags.through: RECIPES,
+    Tag: TAGS,
+    Ingredient: INGREDIENTS,
+    ProjectUser: USERS,
+}
+TAG_PATHS = ('/api/tags/',)
+NOT_PROFILE_FIELDS = frozenset({'last_login', 'password'})
+
+# Массовые операции и сериализатор рецепта сами обновляют счетчики, ленты
+# и журналы изменений одним запросом.
+bulk_change = ContextVar('bulk_change', default=False)
+
+
+def bump_on_commit(sender):
+    transaction.on_commit(partial(bump, GENERATIONS[sender]))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=RecipeIngredient)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=ProjectUser)
+def model_changed(sender, **kwargs):
+    bump_on_commit(sender)
+
+
+@receiver(post_save, sender=ProjectUser)
+def profile_changed(sender, update_fields=None, **kwargs):
+    if update_fields is None or not update_fields <= NOT_PROFILE_FIELDS:
+        bump_on_commit(sender)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_on_commit(sender)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    transaction.on_commit(partial(refresh_paths, recipe_paths(instance.id)))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    transaction.on_commit(partial(refresh_paths, TAG_PATHS))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_published(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(partial(fan_out, instance))
+        transaction.on_commit(partial(recipe_ids.add, instance.id))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    transaction.on_commit(partial(recipe_ids.discard, instance.id))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(partial(backfill, instance))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    if not bulk_change.get():
+        unfollow(instance)
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_added(sender, instance, created, **kwargs):
+    if created:
+        Recipe.objects.filter(pk=instance.recipe_id).update(
+            favorites_count=F('favorites_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_removed(sender, instance, **kwargs):
+    if bulk_change.get():
+        return
+    Recipe.objects.filter(
+        pk=instance.recipe_id, favorites_count__gt=0
+    ).update(favorites_count=F('favorites_count') - 1)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingList)
+@receiver(post_delete, sender=Follow)
+def user_state_changed(sender, instance, created=True, **kwargs):
+    if bulk_change.get() or not created:
+        return
+    object_id = (
+        instance.author_id if sender is Follow else instance.recipe_id
+    )
+    transaction.on_commit(partial(
+        record_changes, instance.user_id, MODEL_KINDS[sender], [object_id]
+    ))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    if not bulk_change.get():
+        recipe_changes.record([instance.id])
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_removed(sender, instance, **kwargs):
+    recipe_changes.record([instance.id], RecipeChange.DELETE)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, origin=None, **kwargs):
+    # При удалении рецепта или автора его продукты удаляются каскадом,
+    # а рецепт сам попадает в журнал удалением.
+    origin = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if bulk_change.get() or origin in (Recipe, ProjectUser):
+        return
+    recipe_changes.record([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_assigned(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if bulk_change.get():
+        return
+    if not reverse and action in ('post_add', 'post_remove', 'post_clear'):
+        recipe_changes.record([instance.id])
+    elif reverse and action in ('post_add', 'post_remove'):
+        recipe_changes.record(sorted(pk_set))
+    elif reverse and action == 'pre_clear':
+        recipe_changes.record(instance.recipes.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def tag_edited(sender, instance, created=False, **kwargs):
+    if not created:
+        recipe_changes.record(instance.recipes.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_renamed(sender, instance, created, **kwargs):
+    if not created:
+        recipe_changes.record(
+            instance.ingredients.values_list('recipe_id', flat=True)
+        )
@@ -0,0 +1,169 @@
+"""Расчет похожих рецептов по продуктам и тегам.
+
+Каждый рецепт — строка разреженной матрицы рецепт × (продукт | тег) с весами
+TF-IDF, нормированная по L2, так что произведение строк равно косинусному
+сходству. Соседи ищутся умножением блока строк на транспонированную матрицу
+и выбором top-k среди ненулевых элементов каждой строки.
+"""
+import numpy as np
+from django.db import transaction
+from scipy import sparse
+
+from recipes.models import Recipe, RecipeIngredient, RecipeNeighbor
+
+TAG_WEIGHT = 0.5
+CHUNK_SIZE = 1000
+BATCH_SIZE = 500
+
+
+def recipe_matrix():
+    recipe_ids = np.fromiter(
+        Recipe.objects.order_by('id').values_list('id', flat=True),
+        dtype=np.int64,
+    )
+    ingredients = np.array(
+        RecipeIngredient.objects.values_list('recipe_id', 'ingredient_id'),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    tags = np.array(
+        Recipe.tags.through.objects.values_list('recipe_id', 'tag_id'),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    ingredient_ids, ingredient_columns = np.unique(
+        ingredients[:, 1], return_inverse=True
+    )
+    _, tag_columns = np.unique(tags[:, 1], return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (
+            np.concatenate((
+                np.ones(len(ingredients)),
+                np.full(len(tags), TAG_WEIGHT),
+            )),
+            (
+                np.searchsorted(
+                    recipe_ids,
+                    np.concatenate((ingredients[:, 0], tags[:, 0])),
+                ),
+                np.concatenate((
+                    ingredient_columns,
+                    tag_columns + len(ingredient_ids),
+                )),
+            ),
+        ),
+        shape=(
+            len(recipe_ids),
+            len(ingredient_ids) + (tag_columns.max() + 1 if len(tags) else 0),
+        ),
+    )
+    frequency = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    idf = np.log((1 + len(recipe_ids)) / (1 + frequency)) + 1
+    matrix = matrix @ sparse.diags(idf)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1))).ravel()
+    norms[norms == 0] = 1
+    return recipe_ids, sparse.diags(1 / norms) @ matrix
+
+
+def top_k(columns, scores, k):
+    if len(scores) > k:
+        best = np.argpartition(-scores, k)[:k]
+        columns, scores = columns[best], scores[best]
+    order = np.argsort(-scores, kind='stable')
+    return columns[order], scores[order]
+
+
+def neighbors(recipe_ids, matrix, rows, k):
+    """Для строк rows отдает (id рецепта, [(id соседа, сходство), ...])."""
+    transposed = matrix.T.tocsr()
+    for start in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[start:start + CHUNK_SIZE]
+        similarity = (matrix[chunk] @ transposed).tocsr()
+        for position, row in enumerate(chunk):
+            begin, end = similarity.indptr[position:position + 2]
+            columns = similarity.indices[begin:end]
+            scores = similarity.data[begin:end]
+            keep = columns != row
+            columns, scores = top_k(columns[keep], scores[keep], k)
+            yield recipe_ids[row].item(), list(
+                zip(recipe_ids[columns].tolist(), scores.tolist())
+            )
+
+
+def affected_by(recipe_ids, matrix, changed_rows):
+    """Неизмененные рецепты и их сходство с измененными."""
+    similarity = (matrix @ matrix[changed_rows].T).tocsr()
+    changed = set(recipe_ids[changed_rows].tolist())
+    for row in np.flatnonzero(np.diff(similarity.indptr)):
+        recipe_id = recipe_ids[row].item()
+        if recipe_id in changed:
+            continue
+        begin, end = similarity.indptr[row:row + 2]
+        yield recipe_id, list(zip(
+            recipe_ids[changed_rows][similarity.indices[begin:end]].tolist(),
+            similarity.data[begin:end].tolist(),
+        ))
+
+
+def batches(items):
+    items = list(items)
+    for start in range(0, len(items), BATCH_SIZE):
+        yield items[start:start + BATCH_SIZE]
+
+
+@transaction.atomic
+def save_neighbors(lists, computed_at):
+    for batch in batches(lists.items()):
+        RecipeNeighbor.objects.filter(
+            recipe__in=[recipe_id for recipe_id, _ in batch]
+        ).delete()
+        RecipeNeighbor.objects.bulk_create(
+            RecipeNeighbor(
+                recipe_id=recipe_id,
+                neighbor_id=neighbor_id,
+                score=score,
+                computed_at=computed_at,
+            )
+            for recipe_id, items in batch
+            for neighbor_id, score in items
+        )
+
+
+def rebuild(k, computed_at, since=None):
+    """Пересчитывает соседей и возвращает число обновленных рецептов.
+
+    С since пересчитываются только рецепты, измененные позже since,
+    а у остальных в списках заменяются оценки сходства с ними.
+    """
+    if since is not None:
+        changed_ids = np.fromiter(
+            Recipe.objects.filter(updated_at__gt=since)
+            .values_list('id', flat=True),
+            dtype=np.int64,
+        )
+    recipe_ids, matrix = recipe_matrix()
+    if since is None:
+        rows = np.arange(len(recipe_ids))
+    else:
+        rows = np.flatnonzero(np.isin(recipe_ids, changed_ids))
+    if not len(rows):
+        return 0
+    lists = dict(neighbors(recipe_ids, matrix, rows, k))
+    if since is not None:
+        changed = set(recipe_ids[rows].tolist())
+        updates = dict(affected_by(recipe_ids, matrix, rows))
+        for batch in batches(changed):
+            for recipe_id in RecipeNeighbor.objects.filter(
+                neighbor__in=batch
+            ).values_list('recipe', flat=True):
+                if recipe_id not in changed:
+                    updates.setdefault(recipe_id, [])
+        for batch in batches(updates):
+            for recipe_id, neighbor_id, score in RecipeNeighbor.objects.filter(
+                recipe__in=batch
+            ).values_list('recipe', 'neighbor', 'score'):
+                if neighbor_id not in changed:
+                    updates[recipe_id].append((neighbor_id, score))
+        for recipe_id, items in updates.items():
+            items.sort(key=lambda item: -item[1])
+            lists[recipe_id] = items[:k]
+    save_neighbors(lists, computed_at)
+    return len(lists)
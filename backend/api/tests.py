@@ -0,0 +1,1367 @@
+import asyncio
+import re
+import sys
+from argparse import ArgumentTypeError
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from itertools import cycle, product
+from threading import Event
+from unittest.mock import patch
+
+import orjson
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse, QueryDict
+from django.test import (
+    AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase,
+    override_settings
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone as django_timezone
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.async_views import ASYNC_READ_VIEWS, async_read
+from api.bulk import change_recipes
+from api.db_routers import (
+    PRIMARY_COOKIE, ReplicaRouter, primary_reads, read_from_replica
+)
+from api.feed import feed_page, update_high_follower_authors
+from api.filters import RECIPE_ORDERINGS, RecipeFilter
+from api.middleware import ReplicaRoutingMiddleware
+from api.pagination import PAGE_SIZE
+from api.pantry import PantryIndex
+from api.profiling import CProfileProfiler
+from api.proxy_cache import (
+    REFRESH_ENCODINGS, REFRESH_HEADER, recipe_paths, refresh_paths,
+    send_refreshes
+)
+from api.querylog import MAX_FINGERPRINTS, QueryLog
+from api.recipe_rows import recipe_payloads, recipe_rows
+from api.renderers import ORJSONRenderer
+from api.scores import refresh_scores
+from api.serializers import RecipeReadSerializer
+from api.throttling import (
+    MAX_LOCAL_KEYS, PRUNED_LOCAL_KEYS, LocalBuckets, SharedBuckets
+)
+from api.user_flags import UserFlags
+from api.user_state import bitmap_encode, delta_encode
+from api.views import ProjectUserViewSet
+from api.warmup import build_indexes, request_paths, warm_up, warmup_host
+from foodgram.postgresql_pool.pool import ConnectionPool, PoolTimeout
+from recipes.constants import BULK_MAX_IDS
+from recipes.generations import RECIPES, get_generations
+from recipes.models import (
+    Favorite, FeedEntry, Follow, Ingredient, ProjectUser, Recipe,
+    RecipeChange, RecipeIngredient, ShoppingList, Tag
+)
+from recipes.short_links import (
+    RecipeIds, decode, encode, ids_bitmap, recipe_ids
+)
+
+FIELD_SETS = (None, 'card', 'id,name,author', 'ingredients,text')
+PLAN_RECIPES = 2000
+COOKING_TIME_RANGES = (
+    {},
+    {'cooking_time__gte': 10},
+    {'cooking_time__lte': 60},
+    {'cooking_time__gte': 10, 'cooking_time__lte': 60},
+)
+ORDERING_INDEXES = {
+    None: 'recipe_pub_date',
+    'popular': 'recipe_popular',
+    'trending': 'recipe_trending',
+    'cooking_time': 'recipe_cooking_time',
+    '-cooking_time': 'recipe_cooking_time',
+    'name': 'recipe_name',
+    '-name': 'recipe_name',
+    'favorites': 'recipe_favorites_count',
+}
+FULL_SCAN = {
+    'sqlite': re.compile(r'SCAN recipes_recipe(?! USING)'),
+    'postgresql': re.compile(r'Seq Scan on recipes_recipe'),
+}
+SORT = {
+    'sqlite': re.compile(r'TEMP B-TREE FOR ORDER BY'),
+    'postgresql': re.compile(r'Sort Key'),
+}
+
+
+def create_recipes():
+    authors = [
+        ProjectUser.objects.create(
+            username=f'author{number}',
+            email=f'author{number}@example.com',
+            first_name=f'Имя {number}',
+            last_name=f'Фамилия {number}',
+            avatar=f'users/avatar{number}.png' if number else '',
+        )
+        for number in range(3)
+    ]
+    tags = [
+        Tag.objects.create(name=f'Тег {number}', slug=f'tag{number}')
+        for number in range(3)
+    ]
+    ingredients = [
+        Ingredient.objects.create(
+            name=f'Продукт {number}', measurement_unit='г'
+        )
+        for number in range(5)
+    ]
+    for number in range(8):
+        recipe = Recipe.objects.create(
+            author=authors[number % len(authors)],
+            name=f'Рецепт {number}',
+            text=f'Описание "{number}"\n с переносами',
+            cooking_time=number + 1,
+            image=f'media/recipes/recipe{number}.png',
+        )
+        recipe.tags.set(tags[:number % 4])
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe, ingredient=ingredient, amount=number * 10 + 1
+            )
+            for ingredient in ingredients[number % 3:number % 3 + 3]
+        )
+    return authors
+
+
+def request_with_fields(fields):
+    return Request(APIRequestFactory().get(
+        '/api/recipes/', {'fields': fields} if fields else {}
+    ))
+
+
+class RecipePayloadsTests(TestCase):
+    """recipe_payloads дает тот же JSON, что RecipeReadSerializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = create_recipes()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_payloads_match_serializer(self):
+        renderer = ORJSONRenderer()
+        for fields in FIELD_SETS:
+            with self.subTest(fields=fields):
+                serializer = RecipeReadSerializer(
+                    many=True,
+                    context={
+                        'request': request_with_fields(fields),
+                        'user_flags': UserFlags(),
+                    },
+                ).child
+                expected = [
+                    serializer.to_representation(recipe)
+                    for recipe in Recipe.objects.for_read(
+                        serializer.prefetch_lookups()
+                    )
+                ]
+                actual = recipe_payloads(
+                    serializer, list(recipe_rows(Recipe.objects.all()))
+                )
+                self.assertEqual(
+                    renderer.render(actual), renderer.render(expected)
+                )
+
+    def test_list_matches_serializer_with_user_flags(self):
+        user = self.authors[0]
+        recipes = list(Recipe.objects.all())
+        Favorite.objects.create(user=user, recipe=recipes[0])
+        ShoppingList.objects.create(user=user, recipe=recipes[1])
+        Follow.objects.create(user=user, author=self.authors[1])
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user)}'
+        )
+        for fields in FIELD_SETS:
+            with self.subTest(fields=fields):
+                response = client.get(
+                    '/api/recipes/',
+                    {'limit': 100, **({'fields': fields} if fields else {})},
+                )
+                request = request_with_fields(fields)
+                request.user = user
+                serializer = RecipeReadSerializer(context={
+                    'request': request,
+                    'user_flags': UserFlags.load(user, recipes),
+                })
+                self.assertEqual(
+                    response.json()['results'],
+                    [
+                        serializer.to_representation(recipe)
+                        for recipe in Recipe.objects.for_read(
+                            serializer.prefetch_lookups()
+                        )
+                    ],
+                )
+
+
+class RecipeListIndexTests(TestCase):
+    """Каждая сортировка и фильтр по времени читают рецепты по индексу.
+
+    Планировщику не запрещается полный просмотр таблицы: рецептов
+    достаточно, а статистика собрана ANALYZE, поэтому индекс он выбирает
+    сам, как выбирал бы на рабочей базе.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        author = ProjectUser.objects.create(
+            username='author', email='author@example.com'
+        )
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=author,
+                name=f'Рецепт {number:04}',
+                text='Описание',
+                cooking_time=number % 180 + 1,
+                image='media/recipes/recipe.png',
+                popular_score=number % 97,
+                trending_score=number % 89,
+                favorites_count=number % 83,
+            )
+            for number in range(PLAN_RECIPES)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def plan(self, ordering, ranges):
+        query = QueryDict(mutable=True)
+        query.update(ranges)
+        if ordering is not None:
+            query['ordering'] = ordering
+        filterset = RecipeFilter(query, queryset=Recipe.objects.all())
+        self.assertTrue(filterset.is_valid(), filterset.errors)
+        return filterset.qs[:PAGE_SIZE].explain()
+
+    def test_orderings_and_ranges_use_indexes(self):
+        vendor = connection.vendor
+        if vendor not in FULL_SCAN:
+            self.skipTest(f'Планы для {vendor} не проверяются')
+        for ordering, ranges in product(ORDERING_INDEXES, COOKING_TIME_RANGES):
+            with self.subTest(ordering=ordering, **ranges):
+                plan = self.plan(ordering, ranges)
+                self.assertIsNone(FULL_SCAN[vendor].search(plan), plan)
+                if not ranges or ordering in ('cooking_time', '-cooking_time'):
+                    self.assertIn(ORDERING_INDEXES[ordering], plan)
+                    self.assertIsNone(SORT[vendor].search(plan), plan)
+                else:
+                    self.assertTrue(
+                        ORDERING_INDEXES[ordering] in plan
+                        or 'recipe_cooking_time' in plan,
+                        plan,
+                    )
+
+    def test_every_ordering_has_an_index(self):
+        self.assertEqual(
+            set(ORDERING_INDEXES) - {None}, set(RECIPE_ORDERINGS)
+        )
+
+
+class RecipeDetailRoutesTests(TestCase):
+    def test_non_numeric_id_is_not_found(self):
+        for path in (
+            '/api/recipes/abc/', '/api/recipes/abc/similar/',
+            '/api/recipes/abc/get-link/', '/api/recipes/1a/similar/',
+        ):
+            with self.subTest(path=path):
+                self.assertEqual(APIClient().get(path).status_code, 404)
+
+
+class ThrottleTests(TestCase):
+    def subscriptions_cost(self, query):
+        view = ProjectUserViewSet(action='subscriptions')
+        return view.get_throttle_cost(Request(
+            APIRequestFactory().get('/api/users/subscriptions/', query)
+        ))
+
+    def test_subscriptions_cost(self):
+        self.assertEqual(self.subscriptions_cost({'omit': 'recipes'}), 1)
+        self.assertEqual(self.subscriptions_cost({'fields': 'id,email'}), 1)
+        self.assertEqual(self.subscriptions_cost({'limit': 6}), 6)
+        self.assertEqual(
+            self.subscriptions_cost({'limit': 6, 'recipes_limit': 3}), 1
+        )
+
+    def test_local_buckets_are_capped(self):
+        buckets = LocalBuckets()
+        for number in range(MAX_LOCAL_KEYS * 3):
+            self.assertIsNone(buckets.take(f'ip_{number}', 10, 3600, 1))
+            self.assertLessEqual(len(buckets.buckets), MAX_LOCAL_KEYS)
+            if number % 1000 == 0:
+                buckets.take('user_1', MAX_LOCAL_KEYS, 3600, 1)
+        self.assertIn('user_1', buckets.buckets)
+        last = f'ip_{MAX_LOCAL_KEYS * 3 - 1}'
+        self.assertIn(last, buckets.buckets)
+        self.assertNotIn('ip_0', buckets.buckets)
+        self.assertGreaterEqual(len(buckets.buckets), PRUNED_LOCAL_KEYS)
+
+    def test_shared_buckets_do_not_lose_concurrent_takes(self):
+        cache.clear()
+        buckets = SharedBuckets('default')
+        with ThreadPoolExecutor(8) as executor:
+            delays = list(executor.map(
+                lambda _: buckets.take('throttle_test', 10, 3600, 1),
+                range(40),
+            ))
+        self.assertEqual(delays.count(None), 10)
+        self.assertGreater(buckets.take('throttle_test', 10, 3600, 1), 0)
+
+
+class BulkFavoritesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = create_recipes()
+
+    def test_favorites_count_matches_rows(self):
+        user, other = self.authors[:2]
+        recipes = list(Recipe.objects.order_by('id'))
+        Favorite.objects.create(user=other, recipe=recipes[0])
+        Recipe.objects.filter(pk=recipes[0].pk).update(favorites_count=5)
+        ids = [recipe.pk for recipe in recipes[:3]]
+        change_recipes(Favorite, user, ids, adding=True)
+        self.assertEqual(
+            dict(Recipe.objects.filter(pk__in=ids).values_list(
+                'id', 'favorites_count'
+            )),
+            {ids[0]: 2, ids[1]: 1, ids[2]: 1},
+        )
+        change_recipes(Favorite, user, ids, adding=False)
+        self.assertEqual(
+            dict(Recipe.objects.filter(pk__in=ids).values_list(
+                'id', 'favorites_count'
+            )),
+            {ids[0]: 1, ids[1]: 0, ids[2]: 0},
+        )
+
+
+class FeedThresholdTests(TestCase):
+    def test_recipes_pulled_above_threshold_stay_after_drop(self):
+        reader, author, _ = create_recipes()
+        Follow.objects.create(user=reader, author=author)
+        with self.settings(FEED_FANOUT_LIMIT=0):
+            self.assertEqual(update_high_follower_authors(), (1, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                author=author, name='Новый', text='Описание',
+                cooking_time=1, image='media/recipes/new.png',
+            )
+        self.assertFalse(FeedEntry.objects.filter(recipe=recipe).exists())
+        pulled, _ = feed_page(reader, None, 10)
+        self.assertEqual(pulled[0], recipe.pk)
+        self.assertEqual(update_high_follower_authors(), (0, 1))
+        self.assertFalse(
+            ProjectUser.objects.filter(feed_pulled=True).exists()
+        )
+        self.assertEqual(feed_page(reader, None, 10)[0], pulled)
+
+    def test_malformed_cursor_is_bad_request(self):
+        reader = ProjectUser.objects.create(
+            username='reader', email='reader@example.com'
+        )
+        client = APIClient()
+        client.force_authenticate(reader)
+        for cursor in ('zzz', 'bm90LWEtZGF0ZXwx'):
+            with self.subTest(cursor=cursor):
+                response = client.get(
+                    '/api/recipes/feed/', {'cursor': cursor}
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('cursor', response.json())
+
+
+class QueryLogTests(TestCase):
+    def test_slow_query_is_logged_when_table_is_full(self):
+        log = QueryLog()
+        for number in range(MAX_FINGERPRINTS):
+            log.record(f'SELECT {number} FROM "table_{number}"', 0)
+        with self.settings(SLOW_QUERY_MS=100), self.assertLogs(
+            'api.querylog', 'WARNING'
+        ) as logs:
+            log.record('SELECT * FROM "new_table"', 0.5)
+        self.assertEqual(len(log.stats), MAX_FINGERPRINTS)
+        self.assertIn('new_table', logs.output[0])
+
+
+class UserStateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author, _ = create_recipes()
+        cls.recipes = list(Recipe.objects.order_by('id'))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def state(self, **query):
+        response = self.client.get('/api/users/me/state/', query)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def favorite(self, recipe, adding=True):
+        with self.captureOnCommitCallbacks(execute=True):
+            change_recipes(Favorite, self.user, [recipe.pk], adding)
+
+    def test_encodings(self):
+        self.assertEqual(delta_encode([7, 3, 5]), [3, 2, 2])
+        self.assertEqual(delta_encode([]), [])
+        self.assertEqual(bitmap_encode({0, 3, 9}), 'CQI=')
+        self.assertEqual(bitmap_encode(set()), '')
+
+    def test_full_state(self):
+        first, second = self.recipes[:2]
+        self.favorite(first)
+        self.favorite(second)
+        state = self.state()
+        self.assertTrue(state['full'])
+        self.assertEqual(
+            state['favorites'], delta_encode([first.pk, second.pk])
+        )
+        self.assertEqual(
+            self.state(encoding='bitmap')['favorites'],
+            bitmap_encode({first.pk, second.pk}),
+        )
+
+    def test_changes_since_version(self):
+        first, second = self.recipes[:2]
+        self.favorite(first)
+        version = self.state()['version']
+        self.favorite(second)
+        self.favorite(first, adding=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(user=self.user, author=self.author)
+        state = self.state(since=version)
+        self.assertFalse(state['full'])
+        self.assertEqual(state['added'], {
+            'favorites': [second.pk],
+            'shopping_cart': [],
+            'subscriptions': [self.author.pk],
+        })
+        self.assertEqual(state['removed']['favorites'], [first.pk])
+        self.assertEqual(
+            self.state(since=state['version'])['added']['favorites'], []
+        )
+
+    def test_unknown_version_returns_full_state(self):
+        self.assertTrue(self.state(since=1)['full'])
+        version = self.state()['version']
+        cache.clear()
+        self.assertTrue(self.state(since=version)['full'])
+
+
+class PantrySearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = ProjectUser.objects.create(
+            username='author', email='author@example.com'
+        )
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Продукт {number}', measurement_unit='г'
+            )
+            for number in range(4)
+        ]
+        cls.tags = [
+            Tag.objects.create(name=f'Тег {number}', slug=f'tag{number}')
+            for number in range(2)
+        ]
+        cls.recipes = []
+        for ingredients, tags in (
+            ((0, 1), (0,)), ((0, 1, 2), (1,)), ((0,), ()),
+            ((0, 2, 3), (0,)), ((2, 3), (0, 1)),
+        ):
+            recipe = Recipe.objects.create(
+                author=author, name='Рецепт', text='Описание',
+                cooking_time=1, image='media/recipes/recipe.png',
+            )
+            recipe.tags.set([cls.tags[number] for number in tags])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=cls.ingredients[number],
+                    amount=1,
+                )
+                for number in ingredients
+            )
+            cls.recipes.append(recipe.pk)
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, tags=None, limit=10):
+        return PantryIndex().search(
+            [self.ingredients[0].pk, self.ingredients[1].pk],
+            None if tags is None else [self.tags[tag].pk for tag in tags],
+            limit,
+        )
+
+    def test_ranked_by_share_then_missing_then_id(self):
+        full, partial, single, sparse, _ = self.recipes
+        self.assertEqual(self.search(), [
+            (single, 1, 1), (full, 2, 2), (partial, 2, 3), (sparse, 1, 3),
+        ])
+        self.assertEqual(self.search(limit=2), [(single, 1, 1), (full, 2, 2)])
+
+    def test_tags_filter_candidates(self):
+        full, partial, _, sparse, _ = self.recipes
+        self.assertEqual(
+            self.search(tags=[0]), [(full, 2, 2), (sparse, 1, 3)]
+        )
+        self.assertEqual(
+            self.search(tags=[0, 1]),
+            [(full, 2, 2), (partial, 2, 3), (sparse, 1, 3)],
+        )
+        self.assertEqual(self.search(tags=[]), [])
+
+
+class ResponseCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_recipes()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_response_varies_on_accept(self):
+        recipe = Recipe.objects.first()
+        for path in ('/api/recipes/', f'/api/recipes/{recipe.pk}/'):
+            with self.subTest(path=path):
+                miss = self.client.get(path)
+                hit = self.client.get(path)
+                self.assertEqual(hit.content, miss.content)
+                self.assertIn('Accept', hit['Vary'])
+                html = self.client.get(path, HTTP_ACCEPT='text/html')
+                self.assertTrue(html['Content-Type'].startswith('text/html'))
+
+    def test_recipe_write_invalidates_responses(self):
+        recipe = Recipe.objects.first()
+        paths = ('/api/recipes/', f'/api/recipes/{recipe.pk}/')
+        for path in paths:
+            self.client.get(path)
+        Recipe.objects.filter(pk=recipe.pk).update(name='Без сигналов')
+        for path in paths:
+            self.assertNotContains(self.client.get(path), 'Без сигналов')
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.name = 'Новое название'
+            recipe.save()
+        for path in paths:
+            with self.subTest(path=path):
+                self.assertContains(self.client.get(path), 'Новое название')
+
+
+class RecipeFragmentsTests(TestCase):
+    """Фрагменты рецептов обновляются после записи, флаги — всегда."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_recipes()[0]
+        cls.token = Token.objects.create(user=cls.user).key
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def recipe_payload(self, recipe):
+        response = self.client.get('/api/recipes/', {'limit': 100})
+        return next(
+            payload for payload in response.json()['results']
+            if payload['id'] == recipe.pk
+        )
+
+    def test_recipe_write_invalidates_fragments(self):
+        recipe = Recipe.objects.filter(tags__isnull=False).first()
+        tag = recipe.tags.first()
+        self.recipe_payload(recipe)
+        Recipe.objects.filter(pk=recipe.pk).update(name='Без сигналов')
+        self.assertEqual(self.recipe_payload(recipe)['name'], recipe.name)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.name = 'Новое название'
+            recipe.save()
+        self.assertEqual(
+            self.recipe_payload(recipe)['name'], 'Новое название'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.name = 'Новый тег'
+            tag.save()
+        tags = self.recipe_payload(recipe)['tags']
+        self.assertIn('Новый тег', [payload['name'] for payload in tags])
+
+    def test_user_flags_overlay_cached_fragments(self):
+        recipe = Recipe.objects.exclude(author=self.user).first()
+        payload = self.recipe_payload(recipe)
+        self.assertFalse(payload['is_favorited'])
+        self.assertFalse(payload['author']['is_subscribed'])
+        Recipe.objects.filter(pk=recipe.pk).update(name='Без сигналов')
+        Favorite.objects.create(user=self.user, recipe=recipe)
+        Follow.objects.create(user=self.user, author=recipe.author)
+        payload = self.recipe_payload(recipe)
+        self.assertEqual(payload['name'], recipe.name)
+        self.assertTrue(payload['is_favorited'])
+        self.assertFalse(payload['is_in_shopping_cart'])
+        self.assertTrue(payload['author']['is_subscribed'])
+        anonymous = APIClient().get('/api/recipes/', {'limit': 100}).json()
+        self.assertFalse(any(
+            payload['is_favorited'] for payload in anonymous['results']
+        ))
+
+
+@override_settings(
+    PROXY_CACHE_URL='http://nginx', PROXY_CACHE_REFRESH_KEY='refresh-key',
+    PROXY_CACHE_HOSTS=['foodgram.example'], PROXY_CACHE_LIST_PATHS=[],
+)
+class ProxyCacheRefreshTests(SimpleTestCase):
+    def test_refreshes_are_batched(self):
+        batches = []
+        sent = Event()
+
+        def send(paths):
+            batches.append(paths)
+            sent.set()
+
+        with patch('api.proxy_cache.REFRESH_DELAY', 0.05), patch(
+            'api.proxy_cache.send_refreshes', send
+        ):
+            refresh_paths(recipe_paths(62))
+            refresh_paths(['/api/recipes/62/', '/api/tags/'])
+            self.assertTrue(sent.wait(5))
+        self.assertEqual(batches, [[
+            '/api/recipes/62/', '/api/recipes/62/get-link/', '/s/62/',
+            '/s/c/10/', '/api/tags/',
+        ]])
+
+    def test_refresh_needs_key(self):
+        with override_settings(PROXY_CACHE_REFRESH_KEY=''), patch(
+            'api.proxy_cache.refresh_queue.add'
+        ) as add:
+            refresh_paths(['/api/tags/'])
+        add.assert_not_called()
+
+    def test_refresh_requests_bypass_cache(self):
+        with patch('api.proxy_cache.opener.open') as open_url:
+            send_refreshes(['/api/tags/'])
+        requests = [call.args[0] for call in open_url.call_args_list]
+        self.assertEqual(
+            [request.get_header('Accept-encoding') for request in requests],
+            list(REFRESH_ENCODINGS),
+        )
+        for request in requests:
+            self.assertEqual(request.full_url, 'http://nginx/api/tags/')
+            self.assertEqual(request.get_header('Host'), 'foodgram.example')
+            self.assertEqual(
+                request.get_header(REFRESH_HEADER.capitalize()),
+                'refresh-key',
+            )
+
+
+class RecipeScoresTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = create_recipes()
+        cls.steady, cls.fresh = Recipe.objects.order_by('id')[:2]
+        now = django_timezone.now()
+        for user in cls.users:
+            Favorite.objects.create(user=user, recipe=cls.steady)
+        Favorite.objects.update(created_at=now - timedelta(days=15))
+        Favorite.objects.create(user=cls.users[0], recipe=cls.fresh)
+        ShoppingList.objects.create(user=cls.users[0], recipe=cls.fresh)
+
+    def setUp(self):
+        cache.clear()
+
+    def first_ids(self, ordering):
+        response = self.client.get('/api/recipes/', {'ordering': ordering})
+        return [recipe['id'] for recipe in response.json()['results'][:2]]
+
+    def test_popular_and_trending_orderings(self):
+        self.first_ids('popular')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(refresh_scores(django_timezone.now()), 2)
+        self.steady.refresh_from_db()
+        self.fresh.refresh_from_db()
+        self.assertAlmostEqual(self.steady.popular_score, 3 * 2 ** -0.5)
+        self.assertAlmostEqual(self.fresh.trending_score, 1.5, places=3)
+        self.assertEqual(
+            self.first_ids('popular'), [self.steady.pk, self.fresh.pk]
+        )
+        self.assertEqual(
+            self.first_ids('trending'), [self.fresh.pk, self.steady.pk]
+        )
+
+
+class ShortLinkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_recipes()
+        cls.recipe = Recipe.objects.first()
+
+    def setUp(self):
+        cache.clear()
+        recipe_ids.reloaded_at = None
+
+    def test_base62_round_trip(self):
+        for number, code in ((0, '0'), (61, 'Z'), (62, '10'), (3843, 'ZZ')):
+            with self.subTest(number=number):
+                self.assertEqual(encode(number), code)
+                self.assertEqual(decode(code), number)
+
+    def test_code_and_legacy_links_redirect(self):
+        link = self.client.get(
+            f'/api/recipes/{self.recipe.pk}/get-link/'
+        ).json()['short-link']
+        code = encode(self.recipe.pk)
+        self.assertTrue(link.endswith(f'/s/c/{code}/'))
+        for path in (f'/s/c/{code}/', f'/s/{self.recipe.pk}/'):
+            with self.subTest(path=path):
+                self.assertRedirects(
+                    self.client.get(path), f'/recipes/{self.recipe.pk}/',
+                    fetch_redirect_response=False,
+                )
+
+    def test_unknown_codes_are_not_found(self):
+        missing = Recipe.objects.order_by('-id').first().pk + 1
+        for path in (
+            f'/s/c/{encode(missing)}/', f'/s/{missing}/', '/s/c/a-b/',
+            f'/api/recipes/{missing}/get-link/',
+        ):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 404)
+
+    def test_deleted_recipe_is_not_found(self):
+        path = f'/s/c/{encode(self.recipe.pk)}/'
+        self.assertEqual(self.client.get(path).status_code, 302)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.delete()
+        self.assertEqual(self.client.get(path).status_code, 404)
+
+
+class RecipeIdsListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_recipes()
+        cls.ids = list(Recipe.objects.values_list('id', flat=True))
+
+    def setUp(self):
+        cache.clear()
+
+    def listed_ids(self, ids, **params):
+        response = self.client.get('/api/recipes/', {'ids': ids, **params})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()]
+
+    def test_requested_order_is_kept(self):
+        first, second, third = self.ids[2], self.ids[0], self.ids[5]
+        missing = max(self.ids) + 1
+        self.assertEqual(
+            self.listed_ids(f'{first},{second},{missing},{first},{third}'),
+            [first, second, third],
+        )
+        self.assertEqual(
+            self.listed_ids(f'{third},{first}', fields='id'),
+            [third, first],
+        )
+
+    def test_filters_apply_to_ids(self):
+        tagged = set(
+            Recipe.objects.filter(tags__slug='tag1')
+            .values_list('id', flat=True)
+        )
+        ids = list(reversed(self.ids))
+        self.assertEqual(
+            self.listed_ids(','.join(map(str, ids)), tags='tag1'),
+            [pk for pk in ids if pk in tagged],
+        )
+
+    def test_too_many_or_malformed_ids(self):
+        ids = range(1, BULK_MAX_IDS + 2)
+        self.assertEqual(
+            self.client.get(
+                '/api/recipes/', {'ids': ','.join(map(str, ids[:-1]))}
+            ).status_code,
+            200,
+        )
+        for value in (','.join(map(str, ids)), '1,a'):
+            with self.subTest(ids=value[-5:]):
+                response = self.client.get('/api/recipes/', {'ids': value})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('ids', response.json())
+
+
+class SparseFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_recipes()[0]
+        cls.recipe = Recipe.objects.first()
+        Favorite.objects.create(user=cls.user, recipe=cls.recipe)
+        cls.token = Token.objects.create(user=cls.user).key
+        cls.paths = ('/api/recipes/', f'/api/recipes/{cls.recipe.pk}/')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def payload(self, path, **params):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return data['results'][0] if 'results' in data else data
+
+    def test_fields_and_omit_prune_payloads(self):
+        full = list(RecipeReadSerializer.Meta.fields)
+        card = RecipeReadSerializer.Meta.field_sets['card']
+        for params, expected in (
+            ({'fields': 'name,id'}, ['id', 'name']),
+            ({'fields': 'id,unknown'}, ['id']),
+            ({'fields': 'card', 'omit': 'author'}, [
+                name for name in card if name != 'author'
+            ]),
+            ({'omit': 'text,ingredients'}, [
+                name for name in full if name not in ('text', 'ingredients')
+            ]),
+            ({'fields': 'unknown'}, []),
+        ):
+            for path in self.paths:
+                with self.subTest(path=path, **params):
+                    self.assertEqual(
+                        list(self.payload(path, **params)), expected
+                    )
+        author = self.payload(self.paths[1], fields='author')['author']
+        self.assertIn('is_subscribed', author)
+
+    def test_pruned_fields_skip_queries(self):
+        skipped = [
+            model._meta.db_table for model in (
+                Tag, RecipeIngredient, Favorite, ShoppingList, Follow
+            )
+        ]
+        for path in self.paths:
+            with self.subTest(path=path):
+                queries = {}
+                for fields in ('', 'id,name,cooking_time'):
+                    cache.clear()
+                    with CaptureQueriesContext(connection) as context:
+                        self.payload(path, fields=fields)
+                    queries[fields] = [
+                        query['sql'] for query in context.captured_queries
+                    ]
+                self.assertLess(
+                    len(queries['id,name,cooking_time']), len(queries[''])
+                )
+                self.assertTrue(any(
+                    f'"{Tag._meta.db_table}"' in sql for sql in queries['']
+                ))
+                for sql in queries['id,name,cooking_time']:
+                    for table in skipped:
+                        self.assertNotIn(f'"{table}"', sql)
+
+
+class ORJSONRendererTests(TestCase):
+    def test_matches_drf_renderer(self):
+        data = {
+            'text': 'Строка "с кавычками"\n\u2028',
+            'number': 10,
+            'decimal': Decimal('1.50'),
+            'created': datetime(2024, 5, 1, 12, 30, 5, 123456, timezone.utc),
+            'naive': datetime(2024, 5, 1, 12, 30, 5),
+            'day': date(2024, 5, 1),
+            'time': time(12, 30, 5, 123456),
+            'items': [None, True, {'id': 1}],
+        }
+        self.assertEqual(
+            ORJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def route_count(self, route):
+        match = re.search(
+            'foodgram_request_duration_seconds_count'
+            f'{{route="{route}"}} (\\d+)',
+            self.client.get('/metrics').content.decode(),
+        )
+        return int(match[1]) if match else 0
+
+    def test_server_timing_and_metrics(self):
+        Tag.objects.create(name='Тег', slug='tag')
+        before = self.route_count('TagViewSet.list')
+        response = self.client.get('/api/tags/')
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="[1-9]\d* queries", '
+            r'serialize;dur=[\d.]+, render;dur=[\d.]+, '
+            r'compress;dur=[\d.]+, total;dur=[\d.]+$',
+        )
+        self.assertEqual(self.route_count('TagViewSet.list'), before + 1)
+
+
+def profiled_leaf():
+    return sum(range(20000))
+
+
+def profiled_root():
+    return profiled_leaf() + profiled_leaf()
+
+
+class ProfilerTests(TestCase):
+    COLLAPSED_LINE = re.compile(r'^\S.* \d+$')
+
+    def setUp(self):
+        self.staff = ProjectUser.objects.create(
+            username='staff', email='staff@example.com', is_staff=True
+        )
+
+    def test_cprofile_output_is_collapsed_stacks(self):
+        with CProfileProfiler() as profile:
+            profiled_root()
+        stacks = dict(
+            line.rsplit(' ', 1) for line in profile.output.splitlines()
+        )
+        summed = '<built-in method builtins.sum>'
+        leaf = [
+            stack for stack in stacks
+            if stack.split(';')[-1].startswith(summed)
+        ]
+        self.assertEqual(len(leaf), 1)
+        frames = [frame.split(' (')[0] for frame in leaf[0].split(';')]
+        self.assertEqual(
+            frames[-3:], ['profiled_root', 'profiled_leaf', summed]
+        )
+
+    def test_staff_gets_profile(self):
+        client = APIClient()
+        client.force_login(self.staff)
+        for mode in ('cprofile', 'sample'):
+            with self.subTest(mode=mode):
+                response = client.get('/api/tags/', HTTP_X_PROFILE=mode)
+                self.assertEqual(response['X-Profiled-Status'], '200')
+                self.assertTrue(
+                    response['Content-Type'].startswith('text/plain')
+                )
+                for line in response.content.decode().splitlines():
+                    self.assertRegex(line, self.COLLAPSED_LINE)
+
+    def test_other_users_get_normal_response(self):
+        client = APIClient()
+        client.force_login(ProjectUser.objects.create(
+            username='user', email='user@example.com'
+        ))
+        for current in (APIClient(), client):
+            response = current.get('/api/tags/?_profile=cprofile')
+            self.assertNotIn('X-Profiled-Status', response)
+            self.assertEqual(response.json(), [])
+
+
+class AsyncReadTests(TestCase):
+    """Асинхронные read-вьюхи отвечают так же, как вьюсеты DRF."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author, _ = create_recipes()
+        recipes = list(Recipe.objects.order_by('id'))
+        Favorite.objects.create(user=cls.user, recipe=recipes[0])
+        ShoppingList.objects.create(user=cls.user, recipe=recipes[1])
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.token = Token.objects.create(user=cls.user).key
+        cls.paths = (
+            '/api/tags/',
+            f'/api/tags/{Tag.objects.first().pk}/',
+            '/api/ingredients/?name=Продукт',
+            f'/api/ingredients/{Ingredient.objects.first().pk}/',
+            '/api/recipes/',
+            '/api/recipes/?limit=3&page=2',
+            '/api/recipes/?tags=tag1&fields=card',
+            f'/api/recipes/{recipes[0].pk}/',
+        )
+
+    async def async_get(self, path, headers):
+        match = resolve(path.split('?')[0])
+        view = async_read(match.func, ASYNC_READ_VIEWS[match.url_name])
+        return await view(
+            AsyncRequestFactory().get(path, headers=headers),
+            *match.args, **match.kwargs
+        )
+
+    async def test_async_views_match_viewsets(self):
+        for headers in ({}, {'Authorization': f'Token {self.token}'}):
+            for path in self.paths:
+                with self.subTest(path=path, authorized=bool(headers)):
+                    await cache.aclear()
+                    expected = await self.async_client.get(
+                        path, headers=headers
+                    )
+                    await cache.aclear()
+                    response = await self.async_get(path, headers)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(
+                        orjson.loads(response.content), expected.json()
+                    )
+
+    async def test_unhandled_requests_fall_back_to_viewsets(self):
+        for path, status_code in (
+            ('/api/recipes/?page=99', 404),
+            ('/api/recipes/?ordering=unknown', 400),
+            ('/api/tags/999999/', 404),
+        ):
+            with self.subTest(path=path):
+                response = await self.async_get(path, {})
+                self.assertEqual(response.status_code, status_code)
+
+
+class FakeConnection:
+    class info:
+        transaction_status = TRANSACTION_STATUS_IDLE
+
+    def __init__(self):
+        self.closed = 0
+
+    def close(self):
+        self.closed = 1
+
+
+def unavailable():
+    raise OSError('БД недоступна')
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def test_failed_open_releases_slots(self):
+        calls = []
+
+        def connect():
+            calls.append(None)
+            if len(calls) == 2:
+                unavailable()
+            return FakeConnection()
+
+        pool = ConnectionPool(connect, min_size=3, max_size=3, timeout=0.1)
+        with self.assertRaises(OSError):
+            pool.open()
+        self.assertEqual(
+            (pool.size, len(pool.idle), len(pool.created)), (1, 1, 1)
+        )
+        pool.open()
+        self.assertEqual((pool.size, len(pool.idle)), (3, 3))
+
+    def test_failed_connect_releases_slot(self):
+        pool = ConnectionPool(FakeConnection, max_size=1, timeout=0.1)
+        pool.connect = unavailable
+        with self.assertRaises(OSError):
+            pool.getconn()
+        self.assertEqual(pool.size, 0)
+        pool.connect = FakeConnection
+        connection = pool.getconn()
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+        pool.putconn(connection)
+        self.assertIs(pool.getconn(), connection)
+
+    def test_expired_connection_is_closed(self):
+        pool = ConnectionPool(FakeConnection, max_size=2, max_age=-1)
+        connection = pool.getconn()
+        pool.putconn(connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual((pool.size, len(pool.created)), (0, 0))
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    """Чтения API уходят в реплики, клиент после записи читает primary."""
+
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+        self.router.replicas = ['replica_1']
+        self.status_code = 200
+        self.middleware = ReplicaRoutingMiddleware(self.get_response)
+
+    def get_response(self, request):
+        self.database = self.router.db_for_read(Recipe)
+        return HttpResponse(status=self.status_code)
+
+    def database_for(self, request):
+        self.middleware(request)
+        return self.database
+
+    def test_safe_api_reads_go_to_replicas(self):
+        factory = RequestFactory()
+        for request, database in (
+            (factory.get('/api/recipes/'), 'replica_1'),
+            (factory.get('/s/c/1/'), 'replica_1'),
+            (factory.get('/admin/'), 'default'),
+            (factory.post('/api/recipes/'), 'default'),
+            (
+                factory.get('/api/recipes/', HTTP_X_CACHE_REFRESH='1'),
+                'default'
+            ),
+        ):
+            with self.subTest(method=request.method, path=request.path):
+                self.assertEqual(self.database_for(request), database)
+        self.assertFalse(read_from_replica.get())
+
+    def test_primary_reads_inside_replica_request(self):
+        token = read_from_replica.set(True)
+        try:
+            with primary_reads():
+                self.assertEqual(self.router.db_for_read(Recipe), 'default')
+            self.assertEqual(self.router.db_for_read(Recipe), 'replica_1')
+        finally:
+            read_from_replica.reset(token)
+
+    def test_writes_stick_client_to_primary(self):
+        factory = RequestFactory(HTTP_AUTHORIZATION='Token writer')
+        self.status_code = 400
+        response = self.middleware(factory.post('/api/recipes/'))
+        self.assertNotIn(PRIMARY_COOKIE, response.cookies)
+        self.assertEqual(
+            self.database_for(factory.get('/api/recipes/')), 'replica_1'
+        )
+        self.status_code = 201
+        response = self.middleware(factory.post('/api/recipes/'))
+        cookie = response.cookies[PRIMARY_COOKIE].value
+        self.status_code = 200
+        self.assertEqual(
+            self.database_for(factory.get('/api/recipes/')), 'default'
+        )
+        other = RequestFactory(HTTP_AUTHORIZATION='Token reader')
+        self.assertEqual(
+            self.database_for(other.get('/api/recipes/')), 'replica_1'
+        )
+        anonymous = RequestFactory()
+        anonymous.cookies[PRIMARY_COOKIE] = cookie
+        self.assertEqual(
+            self.database_for(anonymous.get('/api/recipes/')), 'default'
+        )
+
+
+class RecipeChangesTests(TestCase):
+    """Лента изменений отдает только устоявшиеся записи журнала."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_recipes()
+        cls.recipes = list(Recipe.objects.order_by('id'))
+
+    def settle(self, age=timedelta(seconds=60)):
+        RecipeChange.objects.update(created_at=django_timezone.now() - age)
+
+    def changes(self, since=0, **params):
+        response = self.client.get(
+            '/api/recipes/changes/', {'since': since, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_recent_changes_wait_for_settle_window(self):
+        self.assertEqual(self.changes(), {
+            'reset': False, 'cursor': '0', 'has_more': False, 'changes': [],
+        })
+        self.settle()
+        page = self.changes()
+        self.assertEqual(
+            [change['id'] for change in page['changes']],
+            [recipe.pk for recipe in self.recipes],
+        )
+        cursor = page['cursor']
+        recipe = self.recipes[0]
+        recipe.name = 'Новое название'
+        recipe.save()
+        deleted = self.recipes[1].pk
+        self.recipes[1].delete()
+        self.assertEqual(self.changes(cursor)['changes'], [])
+        self.assertEqual(self.changes(cursor)['cursor'], cursor)
+        self.settle()
+        self.assertEqual(self.changes(cursor)['changes'], [
+            {'id': recipe.pk, 'op': RecipeChange.UPSERT},
+            {'id': deleted, 'op': RecipeChange.DELETE},
+        ])
+
+    def test_pages_follow_cursor(self):
+        self.settle()
+        seen, cursor, has_more = [], 0, True
+        while has_more:
+            page = self.changes(cursor, limit=3)
+            seen += [change['id'] for change in page['changes']]
+            cursor, has_more = page['cursor'], page['has_more']
+        self.assertEqual(
+            list(dict.fromkeys(seen)), [recipe.pk for recipe in self.recipes]
+        )
+        self.assertEqual(int(cursor), RecipeChange.objects.last().pk)
+
+    def test_pruned_cursor_resets(self):
+        self.settle(timedelta(days=365))
+        recipe = self.recipes[0]
+        recipe.save()
+        call_command('prune_recipe_changes', days=30, stdout=StringIO())
+        self.settle()
+        page = self.changes()
+        last = RecipeChange.objects.get()
+        self.assertEqual(page, {
+            'reset': True, 'cursor': str(last.pk), 'has_more': False,
+            'changes': [],
+        })
+        self.assertEqual(self.changes(page['cursor'])['changes'], [])
+        self.assertFalse(self.changes(last.pk - 1)['reset'])
+
+    def test_bad_parameters(self):
+        for params in ({'since': 'abc'}, {'limit': 0}, {'limit': 'x'}):
+            with self.subTest(**params):
+                response = self.client.get('/api/recipes/changes/', params)
+                self.assertEqual(response.status_code, 400)
+
+
+def import_benchmark(name):
+    """Скрипты benchmarks импортируют друг друга как модули верхнего уровня."""
+    path = str(settings.BASE_DIR / 'benchmarks')
+    if path not in sys.path:
+        sys.path.append(path)
+    return import_module(name)
+
+
+async def serve_statuses(reader, writer):
+    request = await reader.readuntil(b'\r\n\r\n')
+    status = request.split(b' ', 2)[1].strip(b'/').decode()
+    writer.write(
+        f'HTTP/1.1 {status} Status\r\nContent-Length: 0\r\n\r\n'.encode()
+    )
+    await writer.drain()
+    writer.close()
+
+
+class LoadTestScriptTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.loadtest = import_benchmark('loadtest')
+        cls.http_load = import_benchmark('http_load')
+
+    def target(self, favorites=None):
+        target = self.loadtest.Target('http://127.0.0.1:8000')
+        target.recipe_ids = [1]
+        target.short_links = ['/s/c/1/']
+        target.favorites = favorites or {}
+        return target
+
+    def test_parse_mix(self):
+        self.assertEqual(
+            self.loadtest.parse_mix('anonymous=3,favorites=1.5'),
+            {'anonymous': 3.0, 'favorites': 1.5},
+        )
+        with self.assertRaises(ArgumentTypeError):
+            self.loadtest.parse_mix('anonymous=1,unknown=1')
+
+    def test_without_users_only_anonymous_runs(self):
+        next_request = self.loadtest.request_source(
+            self.target(), {'anonymous': 1, 'favorites': 10}, seed=1
+        )
+        for _ in range(50):
+            name, method, path, headers, body = next_request()
+            self.assertEqual(method, 'GET')
+            self.assertNotIn('Authorization', headers)
+        with self.assertRaises(SystemExit):
+            self.loadtest.request_source(self.target(), {'lists': 1}, seed=1)
+
+    def test_favorite_toggles_follow_state(self):
+        target = self.target({'token': {1}})
+        next_request = self.loadtest.request_source(
+            target, {'favorites': 1}, seed=1
+        )
+        self.assertEqual(
+            [next_request()[:2] for _ in range(3)],
+            [
+                ('favorite DELETE', 'DELETE'),
+                ('favorite POST', 'POST'),
+                ('favorite DELETE', 'DELETE'),
+            ],
+        )
+        self.assertEqual(next_request()[3]['Authorization'], 'Token token')
+
+    def test_run_load_counts_statuses(self):
+        requests = cycle(
+            (('found', '/200/'), ('missing', '/404/'), ('failing', '/503/'))
+        )
+
+        def next_request():
+            name, path = next(requests)
+            return name, 'GET', path, {}, b''
+
+        async def load():
+            server = await asyncio.start_server(
+                serve_statuses, '127.0.0.1', 0
+            )
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return await self.http_load.run_load(
+                    f'http://127.0.0.1:{port}', next_request,
+                    concurrency=2, duration=0.2,
+                )
+
+        result = asyncio.run(load())
+        self.assertEqual(
+            {
+                name: set(statuses)
+                for name, statuses in result.statuses.items()
+            },
+            {'found': {200}, 'missing': {404}, 'failing': {503}},
+        )
+        self.assertEqual(
+            dict(result.errors), {'failing': result.statuses['failing'][503]}
+        )
+        self.assertEqual(set(result.latencies), {'found', 'missing'})
+        table = self.loadtest.statuses_table(result)
+        self.assertIn('404', table)
+        self.assertIn('503', table)
+        self.assertNotIn('found', table)
+
+
+class WarmUpTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_recipes()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_indexes_are_built(self):
+        pantry, short_links = PantryIndex(), RecipeIds()
+        with patch('api.warmup.pantry_index', pantry), patch(
+            'api.warmup.recipe_ids', short_links
+        ):
+            build_indexes()
+        ids = set(Recipe.objects.values_list('id', flat=True))
+        self.assertEqual(set(pantry.recipes), ids)
+        self.assertEqual(short_links.bitmap, ids_bitmap(ids))
+        self.assertFalse(short_links.stale(get_generations((RECIPES,))))
+
+    def test_responses_are_cached(self):
+        path = '/api/recipes/?page=1&limit=6&fields=card'
+        with self.assertLogs('api.warmup', 'WARNING') as logs:
+            request_paths([path, '/api/tags/999999/'])
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('/api/tags/999999/', logs.output[0])
+        with self.assertNumQueries(0):
+            response = self.client.get(path, HTTP_HOST=warmup_host())
+        self.assertEqual(response.status_code, 200)
+
+    def test_failure_is_logged(self):
+        with patch('api.warmup.open_connections', side_effect=OSError), \
+                patch('api.warmup.connections.close_all') as close_all, \
+                self.assertLogs('api.warmup') as logs:
+            warm_up()
+        close_all.assert_called_once()
+        self.assertEqual(
+            [record.levelname for record in logs.records], ['ERROR', 'INFO']
+        )
@@ -0,0 +1,159 @@
+"""Ограничение частоты дорогих запросов корзиной токенов.
+
+Корзина клиента вмещает N токенов и пополняется со скоростью N за период
+ставки 'N/период'. Действия связываются с областью в атрибуте
+throttle_scopes представления; ставка берется из DEFAULT_THROTTLE_RATES
+по имени области для пользователей и по '<область>_anon' для анонимных
+запросов, которые различаются по IP. Дорогой запрос может списать
+несколько токенов: их число возвращает метод get_throttle_cost
+представления.
+
+Состояние хранится в словаре процесса. Запись — кортеж, который
+заменяется целиком, поэтому блокировки не нужны: в гонке потоков
+клиент может получить лишний запрос, но не потерять токены. Если задан
+THROTTLE_CACHE, состояние хранится в этом кеше Django и общее для всех
+процессов. Там корзина — алгоритм GCRA: в ключе лежит время в
+микросекундах, когда корзина снова станет полной, и запрос сдвигает его
+атомарным incr, а отклоненный возвращает назад через decr. Поэтому
+списания параллельных воркеров не теряются; нужен кеш с атомарным
+incr (Redis или Memcached).
+"""
+from math import ceil
+from time import monotonic, time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+MAX_LOCAL_KEYS = 10000
+PRUNED_LOCAL_KEYS = MAX_LOCAL_KEYS * 9 // 10
+MICROSECONDS = 1000000
+
+
+class LocalBuckets:
+    """Корзины в памяти процесса: ключ -> (токены, время, полна с).
+
+    Словарь упорядочен по последнему списанию. Сверх MAX_LOCAL_KEYS
+    корзин удаляются уже наполнившиеся, а если их мало — самые давние,
+    до PRUNED_LOCAL_KEYS: при наплыве анонимов с разных IP память воркера
+    не растет. Вытесненный клиент начинает с полной корзины.
+    """
+
+    clock = staticmethod(monotonic)
+
+    def __init__(self):
+        self.buckets = {}
+
+    def take(self, key, capacity, duration, cost):
+        """Списывает cost токенов; без них возвращает секунды ожидания."""
+        refill = capacity / duration
+        now = self.clock()
+        bucket = self.buckets.get(key)
+        tokens = capacity
+        if bucket is not None:
+            tokens = min(capacity, bucket[0] + (now - bucket[1]) * refill)
+        if tokens < cost:
+            return (cost - tokens) / refill
+        tokens -= cost
+        self.buckets.pop(key, None)
+        if len(self.buckets) >= MAX_LOCAL_KEYS:
+            self.prune()
+        self.buckets[key] = (tokens, now, now + (capacity - tokens) / refill)
+        return None
+
+    def prune(self):
+        now = self.clock()
+        buckets = list(self.buckets.items())
+        excess = len(buckets) - PRUNED_LOCAL_KEYS
+        for key, bucket in buckets:
+            if excess <= 0:
+                break
+            if bucket[2] <= now:
+                self.buckets.pop(key, None)
+                excess -= 1
+        for key, _ in buckets:
+            if excess <= 0:
+                break
+            if self.buckets.pop(key, None) is not None:
+                excess -= 1
+
+
+class SharedBuckets:
+    """Корзины в кеше Django, общие для процессов.
+
+    Ключ живет, пока корзина не наполнится, поэтому после простоя запрос
+    начинает с полной корзины. Если ключ пережил этот момент на долю
+    секунды, клиент получает сверх емкости токены, набранные за это время.
+    """
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def take(self, key, capacity, duration, cost):
+        interval = duration * MICROSECONDS / capacity
+        increment = round(cost * interval)
+        now = round(time() * MICROSECONDS)
+        self.cache.add(key, now, duration + 1)
+        try:
+            full_at = self.cache.incr(key, increment)
+        except ValueError:
+            self.cache.add(key, now + increment, duration + 1)
+            return None
+        if full_at - now > duration * MICROSECONDS:
+            self.cache.decr(key, increment)
+            return (full_at - now) / MICROSECONDS - duration
+        self.cache.touch(key, ceil((full_at - now) / MICROSECONDS) + 1)
+        return None
+
+
+def buckets():
+    if settings.THROTTLE_CACHE:
+        return SharedBuckets(settings.THROTTLE_CACHE)
+    return LocalBuckets()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    store = None
+    parse_rate = SimpleRateThrottle.parse_rate
+
+    def __init__(self):
+        self.delay = None
+
+    @classmethod
+    def get_store(cls):
+        if cls.store is None:
+            cls.store = buckets()
+        return cls.store
+
+    def get_scope(self, request, view):
+        scope = getattr(view, 'throttle_scopes', {}).get(
+            getattr(view, 'action', None)
+        )
+        if scope is None:
+            return None
+        if request.user.is_authenticated:
+            return scope, f'user_{request.user.pk}'
+        return f'{scope}_anon', f'ip_{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        if scope is None:
+            return True
+        scope, ident = scope
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+        capacity, duration = self.parse_rate(rate)
+        cost = 1
+        if hasattr(view, 'get_throttle_cost'):
+            cost = min(capacity, view.get_throttle_cost(request))
+        self.delay = self.get_store().take(
+            f'throttle_{scope}_{ident}', capacity, duration, cost
+        )
+        return self.delay is None
+
+    def wait(self):
+        if self.delay is None:
+            return None
+        return ceil(self.delay)
@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from api.async_views import with_async_reads
 from api.views import (
     IngredientViewSet, ProjectUserViewSet,
     RecipeViewSet, TagViewSet
@@ -14,7 +16,11 @@ router.register('recipes', RecipeViewSet, 'recipes')
 router.register('tags', TagViewSet, 'tags')
 router.register('users', ProjectUserViewSet, 'users')
 
+router_urls = router.urls
+if settings.ASYNC_READ_VIEWS:
+    router_urls = with_async_reads(router_urls)
+
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(router_urls)),
     path('auth/', include('djoser.urls.authtoken')),
 ]
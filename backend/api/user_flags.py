@@ -0,0 +1,78 @@
+from django.db.models import Value
+
+from recipes.models import Favorite, Follow, ShoppingList
+
+FAVORITE = 'favorite'
+SHOPPING_CART = 'shopping_cart'
+SUBSCRIPTION = 'subscription'
+KINDS = (FAVORITE, SHOPPING_CART, SUBSCRIPTION)
+
+
+class UserFlags:
+    """Флаги текущего пользователя для страницы рецептов."""
+
+    def __init__(self, rows=()):
+        self.ids = {FAVORITE: set(), SHOPPING_CART: set(), SUBSCRIPTION: set()}
+        for kind, object_id in rows:
+            self.ids[kind].add(object_id)
+
+    @property
+    def favorited(self):
+        return self.ids[FAVORITE]
+
+    @property
+    def in_shopping_cart(self):
+        return self.ids[SHOPPING_CART]
+
+    @property
+    def subscribed(self):
+        return self.ids[SUBSCRIPTION]
+
+    @staticmethod
+    def queryset(user, kinds, recipe_ids=None, author_ids=None):
+        """Строки (вид, id) для kinds; без id — все связи пользователя."""
+        sources = {
+            FAVORITE: (Favorite.objects.filter(user=user), 'recipe_id'),
+            SHOPPING_CART: (
+                ShoppingList.objects.filter(user=user), 'recipe_id'
+            ),
+            SUBSCRIPTION: (Follow.objects.filter(user=user), 'author_id'),
+        }
+        filters = {'recipe_id': recipe_ids, 'author_id': author_ids}
+        querysets = []
+        for kind, (queryset, column) in sources.items():
+            if kind not in kinds:
+                continue
+            if filters[column] is not None:
+                queryset = queryset.filter(
+                    **{f'{column}__in': filters[column]}
+                )
+            querysets.append(
+                queryset.order_by().annotate(kind=Value(kind))
+                .values_list('kind', column)
+            )
+        first, *rest = querysets
+        return first.union(*rest, all=True) if rest else first
+
+    @staticmethod
+    def recipe_filters(recipes):
+        return (
+            [recipe.id for recipe in recipes],
+            {recipe.author_id for recipe in recipes},
+        )
+
+    @classmethod
+    def load(cls, user, recipes, kinds=KINDS):
+        if not user.is_authenticated or not recipes or not kinds:
+            return cls()
+        return cls(cls.queryset(user, kinds, *cls.recipe_filters(recipes)))
+
+    @classmethod
+    async def aload(cls, user, recipes, kinds=KINDS):
+        if not user.is_authenticated or not recipes or not kinds:
+            return cls()
+        return cls([
+            row async for row in cls.queryset(
+                user, kinds, *cls.recipe_filters(recipes)
+            )
+        ])
@@ -0,0 +1,160 @@
+"""Состояние пользователя для отрисовки флагов на клиенте.
+
+Клиент получает id избранных рецептов, рецептов в списке покупок и
+авторов, на которых подписан, и сам отмечает ими карточки. Версия
+состояния — счетчик пользователя в общем кеше. Каждое изменение
+увеличивает его и записывает под новой версией пару (вид, id). Запрос
+с since= собирает пары от since до текущей версии и проверяет по БД,
+есть ли сейчас каждая из этих связей. Поэтому порядок записей в журнале
+не важен, а повторно примененное изменение ничего не ломает. Если
+журнал неполон (вытеснен из кеша или длиннее MAX_DELTA), отдается
+полное состояние. Счетчик и журнал должны быть общими для воркеров
+(REDIS_URL): с кешем в памяти процесса у каждого воркера свой счетчик,
+версия другого воркера почти всегда дает полное состояние.
+"""
+import base64
+from time import time_ns
+
+from django.core.cache import cache
+from rest_framework.exceptions import ValidationError
+
+from api.user_flags import (
+    FAVORITE, KINDS, SHOPPING_CART, SUBSCRIPTION, UserFlags
+)
+from recipes.models import Favorite, Follow, ShoppingList
+
+VERSION_KEY = 'user_state:{}'
+CHANGE_KEY = 'user_state:{}:{}'
+CHANGE_TIMEOUT = 24 * 60 * 60
+MAX_DELTA = 500
+FIELDS = {
+    FAVORITE: 'favorites',
+    SHOPPING_CART: 'shopping_cart',
+    SUBSCRIPTION: 'subscriptions',
+}
+MODEL_KINDS = {
+    Favorite: FAVORITE,
+    ShoppingList: SHOPPING_CART,
+    Follow: SUBSCRIPTION,
+}
+
+
+def delta_encode(ids):
+    """Первый id и разности между соседними id по возрастанию."""
+    encoded, previous = [], 0
+    for object_id in sorted(ids):
+        encoded.append(object_id - previous)
+        previous = object_id
+    return encoded
+
+
+def bitmap_encode(ids):
+    """Base64 битовой карты: бит n младшим порядком означает id n."""
+    bitmap = 0
+    for object_id in ids:
+        bitmap |= 1 << object_id
+    return base64.b64encode(
+        bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    ).decode()
+
+
+ENCODINGS = {'delta': delta_encode, 'bitmap': bitmap_encode}
+
+
+def current_version(user_id):
+    key = VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def record_changes(user_id, kind, object_ids):
+    """Записывает в журнал изменение связей пользователя с object_ids.
+
+    Без счетчика в кеше начинается новый отсчет с текущего времени:
+    все выданные раньше версии меньше его на большее, чем MAX_DELTA,
+    и получат полное состояние.
+    """
+    if not object_ids:
+        return
+    key = VERSION_KEY.format(user_id)
+    try:
+        version = cache.incr(key, len(object_ids))
+    except ValueError:
+        cache.add(key, time_ns(), timeout=None)
+        return
+    first = version - len(object_ids) + 1
+    cache.set_many(
+        {
+            CHANGE_KEY.format(user_id, first + offset): (kind, object_id)
+            for offset, object_id in enumerate(object_ids)
+        },
+        CHANGE_TIMEOUT,
+    )
+
+
+def changed_ids(user_id, since, version):
+    """id по видам, изменившиеся после since, или None без журнала."""
+    if not 0 <= version - since <= MAX_DELTA:
+        return None
+    keys = [
+        CHANGE_KEY.format(user_id, number)
+        for number in range(since + 1, version + 1)
+    ]
+    entries = cache.get_many(keys)
+    if len(entries) < len(keys):
+        return None
+    changed = {kind: set() for kind in KINDS}
+    for kind, object_id in entries.values():
+        changed[kind].add(object_id)
+    return changed
+
+
+def parse_since(value):
+    if value is None:
+        return None
+    if not value.isdigit():
+        raise ValidationError({'since': 'Ожидается версия из ответа.'})
+    return int(value)
+
+
+def user_state(user, since=None, encoding='delta'):
+    """Полное состояние или изменения с версии since."""
+    if encoding not in ENCODINGS:
+        raise ValidationError(
+            {'encoding': f'Допустимые значения: {", ".join(ENCODINGS)}.'}
+        )
+    encode = ENCODINGS[encoding]
+    version = current_version(user.pk)
+    changed = None if since is None else changed_ids(user.pk, since, version)
+    if changed is None:
+        flags = UserFlags(UserFlags.queryset(user, KINDS))
+        return {
+            'version': str(version),
+            'full': True,
+            **{
+                FIELDS[kind]: encode(flags.ids[kind]) for kind in KINDS
+            },
+        }
+    flags = UserFlags()
+    if any(changed.values()):
+        flags = UserFlags(UserFlags.queryset(
+            user,
+            [kind for kind in KINDS if changed[kind]],
+            changed[FAVORITE] | changed[SHOPPING_CART],
+            changed[SUBSCRIPTION],
+        ))
+    return {
+        'version': str(version),
+        'full': False,
+        'added': {
+            FIELDS[kind]: encode(changed[kind] & flags.ids[kind])
+            for kind in KINDS
+        },
+        'removed': {
+            FIELDS[kind]: encode(changed[kind] - flags.ids[kind])
+            for kind in KINDS
+        },
+    }
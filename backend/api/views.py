@@ -1,3 +1,6 @@
+from io import BytesIO
+from math import ceil
+
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.db.models import Sum
@@ -5,44 +8,88 @@ from django.http import FileResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserUserViewSet
-from rest_framework import status, viewsets
+from rest_framework import serializers, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import (
     AllowAny, IsAuthenticated,
     IsAuthenticatedOrReadOnly
 )
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
+from rest_framework.utils.urls import replace_query_param
 
+from api.bulk import change_recipes, change_subscriptions
+from api.cache import cached_for_anonymous, recipe_responses
+from api.feed import feed_page
 from api.filters import IngredientFilter, RecipeFilter
 from api.pagination import LimitPagination
+from api.pantry import id_list, pantry_index
 from api.permissions import IsAuthorOrReadOnly
+from api.recipe_changes import CHANGES_LIMIT, CHANGES_MAX_LIMIT, changes_page
+from api.recipe_rows import recipe_rows
 from api.serializers import (
-    AvatarSerializer, IngredientSerializer,
+    AvatarSerializer, BulkIdsSerializer, IngredientSerializer,
     ProjectUserSerializer, RecipeReadSerializer,
     RecipeWriteSerializer, ShortRecipeSerializer,
     SubscriberDetailSerializer, TagSerializer
 )
+from api.user_state import parse_since, user_state
+from api.utils import shopping_list_to_txt
+from recipes.constants import BULK_MAX_IDS, SUBSCRIPTION_RECIPES_PER_TOKEN
 from recipes.models import (
     Favorite, Follow, Ingredient, Recipe,
-    RecipeIngredient, ShoppingList, Tag
+    RecipeIngredient, RecipeNeighbor, ShoppingList, Tag
 )
-from api.utils import shopping_list_to_txt
+from recipes.short_links import recipe_ids
 
 User = get_user_model()
 
 
+def bulk_ids(request):
+    serializer = BulkIdsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data['ids']
+
+
 class ProjectUserViewSet(DjoserUserViewSet):
     queryset = User.objects.all()
     serializer_class = ProjectUserSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
     pagination_class = LimitPagination
+    throttle_scopes = {'avatar': 'uploads', 'subscriptions': 'subscriptions'}
+
+    def get_throttle_cost(self, request):
+        if self.action != 'subscriptions':
+            return 1
+        serializer = SubscriberDetailSerializer(context={'request': request})
+        if 'recipes' not in serializer.fields:
+            return 1
+        return max(1, ceil(
+            self.paginator.get_page_size(request)
+            * serializer.recipes_limit(request)
+            / SUBSCRIPTION_RECIPES_PER_TOKEN
+        ))
 
     @action(['get'], detail=False, permission_classes=(IsAuthenticated,))
     def me(self, request, *args, **kwargs):
         self.get_object = self.get_instance
         return self.retrieve(request, *args, **kwargs)
 
+    @action(
+        ['get'],
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        url_path='me/state',
+        url_name='me-state',
+    )
+    def state(self, request):
+        return Response(user_state(
+            request.user,
+            parse_since(request.query_params.get('since')),
+            request.query_params.get('encoding', 'delta'),
+        ))
+
     @action(
         ['put'],
         detail=False,
@@ -72,7 +119,7 @@ class ProjectUserViewSet(DjoserUserViewSet):
         url_name='subscriptions',
     )
     def subscriptions(self, request):
-        subscriptions = request.user.followers.all()
+        subscriptions = request.user.followers.select_related('author')
         authors = [subscription.author for subscription in subscriptions]
         return self.get_paginated_response(
             SubscriberDetailSerializer(
@@ -108,6 +155,20 @@ class ProjectUserViewSet(DjoserUserViewSet):
             author, context={'request': request}
         ).data, status=status.HTTP_201_CREATED)
 
+    @action(
+        detail=False,
+        methods=('post', 'delete'),
+        permission_classes=(IsAuthenticated,),
+        url_path='subscribe',
+        url_name='subscribe-many',
+    )
+    def subscribe_many(self, request):
+        return Response({'results': change_subscriptions(
+            request.user,
+            bulk_ids(request),
+            adding=request.method == 'POST',
+        )})
+
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = (IsAuthorOrReadOnly,)
@@ -128,9 +189,51 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
 class RecipeViewSet(viewsets.ModelViewSet):
     permission_classes = (IsAuthorOrReadOnly,)
     queryset = Recipe.objects.all()
+    lookup_value_regex = r'\d+'
     pagination_class = LimitPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    throttle_scopes = {
+        'create': 'uploads',
+        'update': 'uploads',
+        'partial_update': 'uploads',
+        'download_shopping_cart': 'downloads',
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            return queryset.for_read(self.get_serializer().prefetch_lookups())
+        return queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action == 'list':
+            return recipe_rows(queryset)
+        return queryset
+
+    @cached_for_anonymous(recipe_responses)
+    def list(self, request, *args, **kwargs):
+        if 'ids' in request.query_params:
+            return self.list_by_ids(request)
+        return super().list(request, *args, **kwargs)
+
+    def list_by_ids(self, request):
+        requested_ids = list(dict.fromkeys(id_list(request, 'ids')))
+        if len(requested_ids) > BULK_MAX_IDS:
+            raise serializers.ValidationError(
+                {'ids': f'Не больше {BULK_MAX_IDS} id за запрос.'}
+            )
+        recipes = self.filter_queryset(self.get_queryset()).in_bulk(
+            requested_ids, field_name='id'
+        )
+        return Response(self.get_serializer(
+            [recipes[pk] for pk in requested_ids if pk in recipes], many=True
+        ).data)
+
+    @cached_for_anonymous(recipe_responses)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve', 'get-link'):
@@ -148,17 +251,112 @@ class RecipeViewSet(viewsets.ModelViewSet):
         url_name='get-link',
     )
     def get_link(self, request, pk=None):
-        if not Recipe.objects.filter(pk=pk).exists():
-            raise ValidationError(f'Рецепт с ID {pk} не найден')
+        if not pk.isdigit() or int(pk) not in recipe_ids:
+            raise NotFound(f'Рецепт с ID {pk} не найден')
         return Response(
             {
                 'short-link': request.build_absolute_uri(
-                    reverse('short_url', args=[pk])
+                    reverse('short_code_url', args=[pk])
                 )
             },
             status=status.HTTP_200_OK
         )
 
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=[IsAuthenticated],
+    )
+    def feed(self, request):
+        page_ids, next_cursor = feed_page(
+            request.user,
+            request.query_params.get('cursor'),
+            self.paginator.get_page_size(request),
+        )
+        recipes = recipe_rows(Recipe.objects.all()).in_bulk(
+            page_ids, field_name='id'
+        )
+        return Response({
+            'next': next_cursor and replace_query_param(
+                request.build_absolute_uri(), 'cursor', next_cursor
+            ),
+            'results': RecipeReadSerializer(
+                [recipes[pk] for pk in page_ids if pk in recipes],
+                many=True,
+                context={'request': request},
+            ).data,
+        })
+
+    @action(detail=True, methods=['GET'], permission_classes=[AllowAny])
+    def similar(self, request, pk=None):
+        neighbor_ids = list(
+            RecipeNeighbor.objects.filter(recipe=pk).order_by('-score')
+            .values_list('neighbor', flat=True)[
+                :self.paginator.get_page_size(request)
+            ]
+        )
+        if not neighbor_ids:
+            get_object_or_404(Recipe, pk=pk)
+        recipes = recipe_rows(Recipe.objects.all()).in_bulk(
+            neighbor_ids, field_name='id'
+        )
+        return Response(RecipeReadSerializer(
+            [recipes[pk] for pk in neighbor_ids if pk in recipes],
+            many=True,
+            context={'request': request},
+        ).data)
+
+    @action(detail=False, methods=['GET'], permission_classes=[AllowAny])
+    def changes(self, request):
+        since = request.query_params.get('since', '0')
+        limit = request.query_params.get('limit', str(CHANGES_LIMIT))
+        if not since.isdigit():
+            raise serializers.ValidationError(
+                {'since': 'Ожидается курсор из ответа.'}
+            )
+        if not limit.isdigit() or not 0 < int(limit) <= CHANGES_MAX_LIMIT:
+            raise serializers.ValidationError(
+                {'limit': f'Число от 1 до {CHANGES_MAX_LIMIT}.'}
+            )
+        return Response(changes_page(int(since), int(limit)))
+
+    @action(detail=False, methods=['GET'], permission_classes=[AllowAny])
+    def pantry(self, request):
+        ingredient_ids = id_list(request, 'ingredients')
+        if not ingredient_ids:
+            raise serializers.ValidationError(
+                {'ingredients': 'Укажите id продуктов.'}
+            )
+        tag_ids = None
+        if 'tags' in request.query_params:
+            tag_ids = list(Tag.objects.filter(
+                slug__in=request.query_params.getlist('tags')
+            ).values_list('id', flat=True))
+        matches = pantry_index.search(
+            ingredient_ids, tag_ids, self.paginator.get_page_size(request)
+        )
+        recipes = recipe_rows(Recipe.objects.all()).in_bulk(
+            [recipe_id for recipe_id, *_ in matches], field_name='id'
+        )
+        pantry_index.discard(
+            recipe_id for recipe_id, *_ in matches
+            if recipe_id not in recipes
+        )
+        matches = [match for match in matches if match[0] in recipes]
+        data = RecipeReadSerializer(
+            [recipes[recipe_id] for recipe_id, *_ in matches],
+            many=True,
+            context={'request': request},
+        ).data
+        return Response([
+            {
+                **recipe,
+                'owned_ingredients': owned,
+                'required_ingredients': required,
+            }
+            for recipe, (_, owned, required) in zip(data, matches)
+        ])
+
     @staticmethod
     def manage_list_item(
         model, pk,
@@ -193,6 +391,21 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer_class=ShortRecipeSerializer,
         )
 
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart',
+        url_name='shopping-cart-many',
+    )
+    def shopping_cart_many(self, request):
+        return Response({'results': change_recipes(
+            ShoppingList,
+            request.user,
+            bulk_ids(request),
+            adding=request.method == 'POST',
+        )})
+
     @action(
         detail=False,
         methods=['GET'],
@@ -213,7 +426,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
             .distinct()
         )
         return FileResponse(
-            shopping_list_to_txt(ingredients, recipes),
+            BytesIO(shopping_list_to_txt(ingredients, recipes).encode()),
             content_type='text/plain'
         )
 
@@ -230,3 +443,18 @@ class RecipeViewSet(viewsets.ModelViewSet):
             error_message=('Рецепт уже есть в избранном.'),
             serializer_class=ShortRecipeSerializer
         )
+
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        permission_classes=[IsAuthenticated],
+        url_path='favorite',
+        url_name='favorite-many',
+    )
+    def favorite_many(self, request):
+        return Response({'results': change_recipes(
+            Favorite,
+            request.user,
+            bulk_ids(request),
+            adding=request.method == 'POST',
+        )})
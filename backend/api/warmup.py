@@ -0,0 +1,66 @@
+"""Прогрев воркера перед приемом запросов.
+
+Открывает соединения с БД (с пулом — сразу MIN_SIZE соединений), строит
+индексы процесса для поиска по продуктам и коротких ссылок и выполняет
+запросы WARMUP_PATHS через обработчик Django: они заполняют резолвер
+URL, загружают ленивые импорты сериализаторов и рендереров и кладут
+ответы анонимам в общий кеш. Вызывается из хука post_worker_init
+gunicorn (gunicorn.conf.py), а не из AppConfig.ready, чтобы не обращаться
+к БД из команд manage.py вроде migrate. Ошибка прогрева пишется в лог
+и не мешает воркеру запуститься.
+"""
+import logging
+from time import perf_counter
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from django.test import RequestFactory
+
+from api.pantry import pantry_index
+from recipes.generations import RECIPES, get_generations
+from recipes.short_links import recipe_ids
+
+logger = logging.getLogger(__name__)
+
+
+def warmup_host():
+    if settings.PROXY_CACHE_HOSTS:
+        return settings.PROXY_CACHE_HOSTS[0].lstrip('.')
+    return 'localhost'
+
+
+def open_connections():
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+def build_indexes():
+    with pantry_index.lock:
+        pantry_index.refresh()
+    recipe_ids.refresh(get_generations((RECIPES,)))
+
+
+def request_paths(paths):
+    handler = WSGIHandler()
+    factory = RequestFactory(HTTP_HOST=warmup_host())
+    for path in paths:
+        response = handler(factory.get(path).environ, lambda *args: None)
+        if response.status_code >= 400:
+            logger.warning(
+                'Прогрев: %s ответил %s', path, response.status_code
+            )
+        response.close()
+
+
+def warm_up():
+    started = perf_counter()
+    try:
+        open_connections()
+        build_indexes()
+        request_paths(settings.WARMUP_PATHS)
+    except Exception:
+        logger.exception('Прогрев воркера не удался')
+    finally:
+        connections.close_all()
+    logger.info('Воркер прогрет за %.0f мс', (perf_counter() - started) * 1000)
@@ -0,0 +1,104 @@
+"""Сравнение пропускной способности и p99 для WSGI и ASGI.
+
+Поочередно поднимает gunicorn с синхронными воркерами и uvicorn
+с ASYNC_READ_VIEWS=true на одной и той же БД и нагружает read-эндпоинты
+рецептов, тегов, продуктов и коротких ссылок. Запуск из каталога backend:
+
+    python benchmarks/asgi_vs_wsgi.py --concurrency 200 --duration 30
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+from http_load import fetch, run_load
+
+SERVERS = {
+    'wsgi': (
+        'gunicorn foodgram.wsgi --workers {workers} '
+        '--bind 127.0.0.1:{port}',
+        'false',
+    ),
+    'asgi': (
+        'uvicorn foodgram.asgi:application --workers {workers} '
+        '--port {port} --log-level warning',
+        'true',
+    ),
+}
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(('127.0.0.1', port)) == 0:
+                return
+        time.sleep(0.2)
+    raise RuntimeError(f'Сервер на порту {port} не запустился')
+
+
+def read_paths(port):
+    _, body = asyncio.run(fetch(
+        '127.0.0.1', port, 'GET', '/api/recipes/?limit=20'
+    ))
+    ids = [recipe['id'] for recipe in json.loads(body)['results']]
+    short_links = [
+        urlsplit(json.loads(asyncio.run(fetch(
+            '127.0.0.1', port, 'GET', f'/api/recipes/{pk}/get-link/'
+        ))[1])['short-link']).path
+        for pk in ids
+    ]
+    return [
+        ('recipes list', '/api/recipes/'),
+        ('recipes list limit=20', '/api/recipes/?limit=20'),
+        *(('recipes detail', f'/api/recipes/{pk}/') for pk in ids),
+        ('tags', '/api/tags/'),
+        ('ingredients', '/api/ingredients/?name=%D0%B0'),
+        *(('short link', path) for path in short_links),
+    ]
+
+
+def benchmark(server, options):
+    command, async_reads = SERVERS[server]
+    env = dict(os.environ, ASYNC_READ_VIEWS=async_reads)
+    process = subprocess.Popen(
+        command.format(workers=options.workers, port=options.port).split(),
+        env=env,
+    )
+    try:
+        wait_for_port(options.port)
+        paths = itertools.cycle(read_paths(options.port))
+
+        def next_request():
+            name, path = next(paths)
+            return name, 'GET', path, {}, b''
+
+        return asyncio.run(run_load(
+            f'http://127.0.0.1:{options.port}', next_request,
+            options.concurrency, options.duration,
+        ))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--port', type=int, default=8099)
+    options = parser.parse_args()
+    for server in SERVERS:
+        result = benchmark(server, options)
+        sys.stdout.write(f'\n{server}\n{result.table()}\n')
+
+
+if __name__ == '__main__':
+    main()
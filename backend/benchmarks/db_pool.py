@@ -0,0 +1,67 @@
+"""Задержка «подключение + запрос + закрытие» с пулом соединений и без.
+
+Имитирует цикл одного HTTP-запроса при CONN_MAX_AGE=0: Django открывает
+соединение, выполняет запрос и закрывает соединение по request_finished.
+Запуск из каталога backend при настроенном PostgreSQL:
+
+    python benchmarks/db_pool.py --iterations 500
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import django
+from http_load import PERCENTILES, percentile
+
+BACKENDS = {
+    'direct': 'django.db.backends.postgresql',
+    'pooled': 'foodgram.postgresql_pool',
+}
+
+
+def setup():
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    from django.conf import settings
+    default = settings.DATABASES['default']
+    for alias, engine in BACKENDS.items():
+        settings.DATABASES[alias] = dict(default, ENGINE=engine)
+    django.setup()
+
+
+def measure(alias, iterations):
+    from django.db import connections
+    connection = connections[alias]
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        connection.close()
+        latencies.append(time.perf_counter() - start)
+    return sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=500)
+    options = parser.parse_args()
+    setup()
+    sys.stdout.write('{:<8} {:>10}'.format('бэкенд', 'среднее') + ''.join(
+        f' {f"p{value}":>8}' for value in PERCENTILES
+    ) + '   (мс)\n')
+    for alias in BACKENDS:
+        latencies = measure(alias, options.iterations)
+        sys.stdout.write(
+            f'{alias:<8} {sum(latencies) / len(latencies) * 1000:>10.2f}'
+            + ''.join(
+                f' {percentile(latencies, value) * 1000:>8.2f}'
+                for value in PERCENTILES
+            ) + '\n'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Минимальный асинхронный HTTP-клиент и статистика для нагрузочных замеров.
+
+Используется только стандартная библиотека, чтобы замеры не зависели
+от установленных пакетов и не вносили накладных расходов клиента.
+"""
+import asyncio
+import time
+from collections import Counter, defaultdict
+from math import ceil
+from urllib.parse import urlsplit
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(ordered, value):
+    if not ordered:
+        return 0.0
+    return ordered[max(ceil(len(ordered) * value / 100) - 1, 0)]
+
+
+async def fetch(host, port, method, path, headers=None, body=b''):
+    reader, writer = await asyncio.open_connection(host, port)
+    lines = [
+        f'{method} {path} HTTP/1.1',
+        f'Host: {host}',
+        'Connection: close',
+        f'Content-Length: {len(body)}',
+    ]
+    lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b'\r\n\r\n')
+    return int(head.split(b' ', 2)[1]), payload
+
+
+class LoadResult:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(Counter)
+        self.elapsed = 0.0
+
+    def rows(self):
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            ordered = sorted(self.latencies[name])
+            yield (
+                name,
+                len(ordered),
+                len(ordered) / self.elapsed if self.elapsed else 0.0,
+                *(percentile(ordered, value) * 1000 for value in PERCENTILES),
+                self.errors[name],
+            )
+
+    def total(self):
+        ordered = sorted(
+            latency
+            for latencies in self.latencies.values()
+            for latency in latencies
+        )
+        return (
+            'ВСЕГО',
+            len(ordered),
+            len(ordered) / self.elapsed if self.elapsed else 0.0,
+            *(percentile(ordered, value) * 1000 for value in PERCENTILES),
+            sum(self.errors.values()),
+        )
+
+    def table(self):
+        header = ('эндпоинт', 'запр.', 'RPS') + tuple(
+            f'p{value}, мс' for value in PERCENTILES
+        ) + ('ошибки',)
+        lines = ['{:<40} {:>8} {:>9} {:>9} {:>9} {:>9} {:>7}'.format(*header)]
+        for row in (*self.rows(), self.total()):
+            lines.append(
+                '{:<40} {:>8} {:>9.1f} {:>9.1f} {:>9.1f} {:>9.1f} {:>7}'
+                .format(*row)
+            )
+        return '\n'.join(lines)
+
+
+async def run_load(base_url, next_request, concurrency, duration):
+    """Держит concurrency параллельных клиентов в течение duration секунд.
+
+    next_request() возвращает кортеж (имя, метод, путь, заголовки, тело);
+    ошибкой считаются ответы 5xx и сетевые сбои, коды всех полученных
+    ответов считаются в result.statuses.
+    """
+    url = urlsplit(base_url)
+    result = LoadResult()
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        while time.perf_counter() < deadline:
+            name, method, path, headers, body = next_request()
+            start = time.perf_counter()
+            try:
+                status, _ = await fetch(
+                    url.hostname, url.port or 80, method, path, headers, body
+                )
+            except OSError:
+                result.errors[name] += 1
+                continue
+            result.statuses[name][status] += 1
+            if status >= 500:
+                result.errors[name] += 1
+            else:
+                result.latencies[name].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - start
+    return result
@@ -0,0 +1,101 @@
+"""Время рендеринга и сжатия страницы рецептов и ее размер в байтах.
+
+Сериализует страницу из --limit рецептов (рецепты из БД повторяются, если их
+меньше) и для стандартного JSONRenderer DRF и ORJSONRenderer замеряет
+рендеринг без сжатия, с gzip и с brotli, если установлен пакет Brotli.
+Запуск из каталога backend при настроенной БД:
+
+    python benchmarks/json_compression.py --limit 100 --iterations 200
+"""
+import argparse
+import os
+import sys
+import time
+from itertools import cycle, islice
+from pathlib import Path
+
+import django
+from http_load import PERCENTILES, percentile
+
+
+def setup():
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    django.setup()
+
+
+def recipe_page(limit):
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from api.serializers import RecipeReadSerializer
+    from recipes.models import Recipe
+
+    recipes = list(Recipe.objects.for_read()[:limit])
+    if not recipes:
+        raise SystemExit('В БД нет рецептов.')
+    request = Request(APIRequestFactory().get('/api/recipes/'))
+    return {
+        'count': limit,
+        'next': None,
+        'previous': None,
+        'results': RecipeReadSerializer(
+            list(islice(cycle(recipes), limit)),
+            many=True,
+            context={'request': request},
+        ).data,
+    }
+
+
+def variants():
+    from rest_framework.renderers import JSONRenderer
+
+    from api.compression import BROTLI, GZIP, brotli, compress
+    from api.renderers import ORJSONRenderer
+
+    encodings = [None, GZIP] + ([BROTLI] if brotli is not None else [])
+    for renderer in (JSONRenderer(), ORJSONRenderer()):
+        for encoding in encodings:
+            yield renderer, encoding, compress
+
+
+def measure(data, renderer, encoding, compress, iterations):
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        content = renderer.render(data)
+        if encoding is not None:
+            content = compress(encoding, content)
+        latencies.append(time.perf_counter() - start)
+    return sorted(latencies), len(content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--iterations', type=int, default=200)
+    options = parser.parse_args()
+    setup()
+    data = recipe_page(options.limit)
+    sys.stdout.write('{:<24} {:>10} {:>10}'.format(
+        'вариант', 'байт', 'среднее'
+    ) + ''.join(
+        f' {f"p{value}":>8}' for value in PERCENTILES
+    ) + '   (мс)\n')
+    for renderer, encoding, compress in variants():
+        name = f'{type(renderer).__name__} {encoding or "identity"}'
+        latencies, size = measure(
+            data, renderer, encoding, compress, options.iterations
+        )
+        sys.stdout.write(
+            f'{name:<24} {size:>10} '
+            f'{sum(latencies) / len(latencies) * 1000:>10.2f}'
+            + ''.join(
+                f' {percentile(latencies, value) * 1000:>8.2f}'
+                for value in PERCENTILES
+            ) + '\n'
+        )
+
+
+if __name__ == '__main__':
+    main()
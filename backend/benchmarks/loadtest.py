@@ -0,0 +1,240 @@
+"""Нагрузка на запущенный сервер взвешенной смесью запросов API.
+
+Сценарии (веса задает --mix):
+
+    anonymous  просмотр без входа: страницы и карточки рецептов, теги,
+               поиск продуктов, короткие ссылки;
+    lists      списки пользователя: избранное, покупки, фильтры по тегам
+               и времени приготовления, сортировки, подписки;
+    favorites  добавление рецепта в избранное и удаление из него;
+    downloads  выгрузка списка покупок.
+
+Для сценариев с авторизацией нужны пользователи (--user почта:пароль,
+можно несколько раз); без них выполняется только anonymous. Выгрузка
+ограничена областью downloads (THROTTLE_DOWNLOADS), поэтому для замера
+ставку стоит поднять, иначе большая часть ответов будет 429. Печатает
+RPS, p50/p95/p99 и ошибки (5xx и сетевые сбои) по эндпоинтам, затем коды
+ответов 4xx и 5xx. Запуск из каталога backend при запущенном сервере:
+
+    python benchmarks/loadtest.py --url http://127.0.0.1:8000 \\
+        --user user@example.com:password --concurrency 50 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+from math import ceil
+from urllib.parse import quote, urlsplit
+
+from http_load import fetch, run_load
+
+PAGE_SIZE = 6
+MAX_PAGE = 5
+DEFAULT_MIX = 'anonymous=60,lists=20,favorites=15,downloads=5'
+ORDERINGS = ('popular', 'trending', 'cooking_time', 'name', 'favorites')
+SEARCH_PREFIXES = ('а', 'б', 'к', 'м', 'п', 'с', 'мол', 'сах')
+JSON_HEADERS = {'Accept': 'application/json'}
+
+
+class Target:
+    """Сервер и данные для запросов, собранные перед нагрузкой."""
+
+    def __init__(self, base_url):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.recipe_ids = []
+        self.pages = 1
+        self.tags = []
+        self.short_links = []
+        self.favorites = {}
+
+    async def request(self, method, path, headers=None, body=b''):
+        status, payload = await fetch(
+            self.host, self.port, method, path,
+            {**JSON_HEADERS, **(headers or {})}, body,
+        )
+        if status >= 400:
+            raise SystemExit(f'{method} {path}: {status} {payload[:200]}')
+        return json.loads(payload) if payload else None
+
+    async def login(self, credentials):
+        email, _, password = credentials.partition(':')
+        token = (await self.request(
+            'POST', '/api/auth/token/login/',
+            {'Content-Type': 'application/json'},
+            json.dumps({'email': email, 'password': password}).encode(),
+        ))['auth_token']
+        self.favorites[token] = {
+            recipe['id'] for recipe in (await self.request(
+                'GET', '/api/recipes/?is_favorited=1&limit=1000&fields=id',
+                {'Authorization': f'Token {token}'},
+            ))['results']
+        }
+
+    async def discover(self, users):
+        for credentials in users:
+            await self.login(credentials)
+        page = await self.request('GET', '/api/recipes/?limit=100&fields=id')
+        self.recipe_ids = [recipe['id'] for recipe in page['results']]
+        self.pages = min(ceil(page['count'] / PAGE_SIZE), MAX_PAGE)
+        if not self.recipe_ids:
+            raise SystemExit('На сервере нет рецептов.')
+        self.tags = [
+            tag['slug'] for tag in await self.request('GET', '/api/tags/')
+        ]
+        for pk in self.recipe_ids[:20]:
+            link = await self.request('GET', f'/api/recipes/{pk}/get-link/')
+            self.short_links.append(urlsplit(link['short-link']).path)
+
+
+def anonymous(target, rng):
+    choice = rng.randrange(6)
+    if choice == 0:
+        return 'recipes list card', None, 'GET', (
+            f'/api/recipes/?page={rng.randint(1, target.pages)}'
+            f'&limit={PAGE_SIZE}&fields=card'
+        )
+    if choice == 1:
+        return 'recipes list', None, 'GET', (
+            f'/api/recipes/?page=1&limit={PAGE_SIZE}'
+        )
+    if choice == 2:
+        return 'recipe detail', None, 'GET', (
+            f'/api/recipes/{rng.choice(target.recipe_ids)}/'
+        )
+    if choice == 3:
+        return 'tags', None, 'GET', '/api/tags/'
+    if choice == 4:
+        return 'ingredients search', None, 'GET', (
+            f'/api/ingredients/?name={quote(rng.choice(SEARCH_PREFIXES))}'
+        )
+    return 'short link', None, 'GET', rng.choice(target.short_links)
+
+
+def lists(target, rng):
+    token = rng.choice(list(target.favorites))
+    choice = rng.randrange(5)
+    if choice == 0:
+        return 'recipes is_favorited', token, 'GET', (
+            '/api/recipes/?is_favorited=1'
+        )
+    if choice == 1:
+        return 'recipes is_in_shopping_cart', token, 'GET', (
+            '/api/recipes/?is_in_shopping_cart=1'
+        )
+    if choice == 2 and target.tags:
+        return 'recipes tags', token, 'GET', (
+            f'/api/recipes/?tags={rng.choice(target.tags)}'
+            f'&cooking_time__lte={rng.choice((15, 30, 60))}'
+        )
+    if choice == 3:
+        return 'recipes ordering', token, 'GET', (
+            f'/api/recipes/?ordering={rng.choice(ORDERINGS)}'
+        )
+    return 'subscriptions', token, 'GET', (
+        '/api/users/subscriptions/?page=1&limit=6&recipes_limit=3'
+    )
+
+
+def favorites(target, rng):
+    token = rng.choice(list(target.favorites))
+    pk = rng.choice(target.recipe_ids)
+    favorited = target.favorites[token]
+    method = 'DELETE' if pk in favorited else 'POST'
+    favorited.symmetric_difference_update((pk,))
+    return f'favorite {method}', token, method, f'/api/recipes/{pk}/favorite/'
+
+
+def downloads(target, rng):
+    token = rng.choice(list(target.favorites))
+    return 'download_shopping_cart', token, 'GET', (
+        '/api/recipes/download_shopping_cart/'
+    )
+
+
+SCENARIOS = {
+    'anonymous': anonymous,
+    'lists': lists,
+    'favorites': favorites,
+    'downloads': downloads,
+}
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f'нет сценария {name}')
+        mix[name] = float(weight)
+    return mix
+
+
+def request_source(target, mix, seed):
+    if not target.favorites:
+        mix = {'anonymous': mix.get('anonymous', 0)}
+    names = [name for name, weight in mix.items() if weight > 0]
+    if not names:
+        raise SystemExit('Нет сценариев: задайте --user или вес anonymous.')
+    weights = [mix[name] for name in names]
+    rng = random.Random(seed)
+
+    def next_request():
+        build = SCENARIOS[rng.choices(names, weights)[0]]
+        name, token, method, path = build(target, rng)
+        headers = dict(JSON_HEADERS)
+        if token is not None:
+            headers['Authorization'] = f'Token {token}'
+        return name, method, path, headers, b''
+
+    return next_request
+
+
+def statuses_table(result):
+    lines = []
+    for name, statuses in sorted(result.statuses.items()):
+        other = {
+            status: count for status, count in sorted(statuses.items())
+            if status >= 400
+        }
+        if other:
+            lines.append(f'{name:<40} ' + ', '.join(
+                f'{status}: {count}' for status, count in other.items()
+            ))
+    return '\n'.join(lines)
+
+
+async def run(options):
+    target = Target(options.url)
+    await target.discover(options.user)
+    return await run_load(
+        options.url,
+        request_source(target, options.mix, options.seed),
+        options.concurrency,
+        options.duration,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--user', action='append', default=[])
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    options = parser.parse_args()
+    result = asyncio.run(run(options))
+    sys.stdout.write(f'{result.table()}\n')
+    statuses = statuses_table(result)
+    if statuses:
+        sys.stdout.write(f'\nответы 4xx и 5xx\n{statuses}\n')
+
+
+if __name__ == '__main__':
+    main()
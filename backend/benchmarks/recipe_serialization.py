@@ -0,0 +1,127 @@
+"""Сравнение RecipeReadSerializer и recipe_payloads: результат и время CPU.
+
+Сначала проверяет, что для каждого рецепта в БД и каждого набора полей
+(все поля и fields=card) обе реализации дают одинаковый JSON байт в байт,
+и завершается с ошибкой при расхождении. Затем замеряет процессорное
+и общее время на страницу из --limit рецептов, включая чтение из БД.
+Запуск из каталога backend при настроенной БД:
+
+    python benchmarks/recipe_serialization.py --limit 100 --iterations 50
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import django
+from http_load import PERCENTILES, percentile
+
+FIELD_SETS = ('', 'card')
+
+
+def setup():
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    django.setup()
+
+
+def child_serializer(fields):
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from api.serializers import RecipeReadSerializer
+    from api.user_flags import UserFlags
+
+    request = Request(APIRequestFactory().get(
+        '/api/recipes/', {'fields': fields} if fields else {}
+    ))
+    return RecipeReadSerializer(
+        many=True,
+        context={'request': request, 'user_flags': UserFlags()},
+    ).child
+
+
+def with_serializer(serializer, limit):
+    from recipes.models import Recipe
+
+    return [
+        serializer.to_representation(recipe)
+        for recipe in Recipe.objects.for_read(
+            serializer.prefetch_lookups()
+        )[:limit]
+    ]
+
+
+def with_rows(serializer, limit):
+    from api.recipe_rows import recipe_payloads, recipe_rows
+    from recipes.models import Recipe
+
+    return recipe_payloads(
+        serializer, list(recipe_rows(Recipe.objects.all())[:limit])
+    )
+
+
+def verify():
+    from api.renderers import ORJSONRenderer
+
+    renderer = ORJSONRenderer()
+    for fields in FIELD_SETS:
+        serializer = child_serializer(fields)
+        expected = with_serializer(serializer, None)
+        actual = with_rows(serializer, None)
+        for reference, payload in zip(expected, actual):
+            if renderer.render(reference) != renderer.render(payload):
+                raise SystemExit(
+                    f'fields={fields!r}, рецепт {reference.get("id")}:\n'
+                    f'{renderer.render(reference).decode()}\n'
+                    f'{renderer.render(payload).decode()}'
+                )
+        if len(expected) != len(actual):
+            raise SystemExit(f'fields={fields!r}: разное число рецептов')
+        sys.stdout.write(
+            f'fields={fields or "все"}: {len(expected)} рецептов совпадают\n'
+        )
+
+
+def measure(build, serializer, limit, iterations):
+    cpu, wall = [], []
+    for _ in range(iterations):
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        build(serializer, limit)
+        cpu.append(time.process_time() - cpu_start)
+        wall.append(time.perf_counter() - wall_start)
+    return sorted(cpu), sorted(wall)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--iterations', type=int, default=50)
+    options = parser.parse_args()
+    setup()
+    verify()
+    sys.stdout.write('{:<22} {:>10} {:>10}'.format(
+        'вариант', 'CPU', 'время'
+    ) + ''.join(
+        f' {f"CPU p{value}":>10}' for value in PERCENTILES
+    ) + '   (мс на страницу)\n')
+    for fields in FIELD_SETS:
+        serializer = child_serializer(fields)
+        for build in (with_serializer, with_rows):
+            cpu, wall = measure(
+                build, serializer, options.limit, options.iterations
+            )
+            name = f'{build.__name__[5:]} {fields or "все"}'
+            sys.stdout.write(
+                f'{name:<22} {sum(cpu) / len(cpu) * 1000:>10.2f} '
+                f'{sum(wall) / len(wall) * 1000:>10.2f}'
+                + ''.join(
+                    f' {percentile(cpu, value) * 1000:>10.2f}'
+                    for value in PERCENTILES
+                ) + '\n'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Время запуска процессов и задержка первого запроса с прогревом и без.
+
+Замеряет время до готовности (медиана по --runs свежим процессам):
+запуск интерпретатора, `manage.py check` и импорт foodgram.wsgi. Затем
+в свежих процессах без прогрева и с api.warmup.warm_up выполняет --path
+через обработчик Django и сравнивает первый запрос с медианой
+следующих --repeat. Запуск из каталога backend при настроенной БД:
+
+    python benchmarks/startup.py --runs 5 --repeat 20
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+DEFAULT_PATHS = (
+    '/api/tags/',
+    '/api/recipes/?page=1&limit=6&fields=card',
+    '/api/recipes/?page=2&limit=6',
+)
+COMMANDS = {
+    'python': [sys.executable, '-c', 'pass'],
+    'manage.py check': [sys.executable, 'manage.py', 'check'],
+    'import foodgram.wsgi': [sys.executable, '-c', 'import foodgram.wsgi'],
+}
+
+
+def process_time(command, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            command, cwd=BACKEND, check=True,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def child(paths, repeat, warm):
+    """Выполняется в свежем процессе; печатает замеры в JSON."""
+    sys.path.insert(0, str(BACKEND))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    start = time.perf_counter()
+    import foodgram.wsgi  # noqa: F401
+    imported = time.perf_counter() - start
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.test import RequestFactory
+
+    from api.warmup import warm_up, warmup_host
+    start = time.perf_counter()
+    if warm:
+        warm_up()
+    warmed = time.perf_counter() - start
+    handler = WSGIHandler()
+    factory = RequestFactory(HTTP_HOST=warmup_host())
+    latencies = {}
+    for path in paths:
+        timings = []
+        for _ in range(repeat + 1):
+            start = time.perf_counter()
+            handler(
+                factory.get(path).environ, lambda *args: None
+            ).close()
+            timings.append(time.perf_counter() - start)
+        latencies[path] = timings
+    json.dump(
+        {'import': imported, 'warmup': warmed, 'latencies': latencies},
+        sys.stdout,
+    )
+
+
+def requests(paths, repeat, warm):
+    command = [
+        sys.executable, __file__, '--child', '--repeat', str(repeat),
+        *(argument for path in paths for argument in ('--path', path)),
+    ]
+    if warm:
+        command.append('--warm')
+    return json.loads(subprocess.run(
+        command, cwd=BACKEND, check=True, capture_output=True, text=True,
+    ).stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--path', action='append')
+    parser.add_argument('--child', action='store_true')
+    parser.add_argument('--warm', action='store_true')
+    options = parser.parse_args()
+    paths = options.path or DEFAULT_PATHS
+    if options.child:
+        return child(paths, options.repeat, options.warm)
+    sys.stdout.write('{:<28} {:>10}\n'.format('процесс', 'мс'))
+    for name, command in COMMANDS.items():
+        sys.stdout.write(
+            f'{name:<28} {process_time(command, options.runs) * 1000:>10.1f}\n'
+        )
+    for warm in (False, True):
+        result = requests(paths, options.repeat, warm)
+        sys.stdout.write(
+            f'\n{"с прогревом" if warm else "без прогрева"}: импорт '
+            f'{result["import"] * 1000:.1f} мс, прогрев '
+            f'{result["warmup"] * 1000:.1f} мс\n'
+            '{:<48} {:>10} {:>10}\n'.format(
+                'путь', 'первый', 'медиана'
+            )
+        )
+        for path, timings in result['latencies'].items():
+            sys.stdout.write(
+                f'{path:<48} {timings[0] * 1000:>10.2f} '
+                f'{statistics.median(timings[1:]) * 1000:>10.2f}\n'
+            )
+
+
+if __name__ == '__main__':
+    main()
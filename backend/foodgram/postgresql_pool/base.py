@@ -0,0 +1,50 @@
+import os
+import threading
+
+from django.db.backends.postgresql import base
+
+from foodgram.postgresql_pool.pool import ConnectionPool
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Бэкенд PostgreSQL, берущий соединения из пула процесса.
+
+    Параметры пула задаются ключом POOL в настройках базы: MIN_SIZE,
+    MAX_SIZE, MAX_AGE, TIMEOUT и CHECK_IDLE. CONN_MAX_AGE должен быть 0,
+    чтобы Django возвращал соединение в пул в конце каждого запроса.
+    """
+
+    def get_pool(self, conn_params):
+        key = (os.getpid(), self.alias)
+        with pools_lock:
+            pool = pools.get(key)
+            created = pool is None
+            if created:
+                options = {
+                    name.lower(): value
+                    for name, value in self.settings_dict.get(
+                        'POOL', {}
+                    ).items()
+                }
+                pool = pools[key] = ConnectionPool(
+                    lambda: super(DatabaseWrapper, self).get_new_connection(
+                        conn_params
+                    ),
+                    **options,
+                )
+        if created:
+            pool.open()
+        return pool
+
+    def get_new_connection(self, conn_params):
+        return self.get_pool(conn_params).getconn()
+
+    def _close(self):
+        pool = pools.get((os.getpid(), self.alias))
+        if pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            pool.putconn(self.connection)
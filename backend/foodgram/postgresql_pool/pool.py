@@ -0,0 +1,124 @@
+import threading
+from collections import deque
+from time import monotonic
+
+from psycopg2 import OperationalError
+from psycopg2.extensions import (
+    TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INERROR,
+    TRANSACTION_STATUS_INTRANS
+)
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """Потокобезопасный пул соединений psycopg2.
+
+    Соединения старше max_age закрываются при возврате в пул, простаивавшие
+    дольше check_idle секунд проверяются запросом SELECT 1 перед выдачей.
+    """
+
+    def __init__(
+        self, connect, min_size=0, max_size=10,
+        max_age=3600, timeout=30, check_idle=30
+    ):
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_age = max_age
+        self.timeout = timeout
+        self.check_idle = check_idle
+        self.idle = deque()
+        self.created = {}
+        self.size = 0
+        self.condition = threading.Condition()
+
+    def open(self):
+        """Создает соединения до min_size, занимая место по одному.
+
+        Если connect() падает, new_connection освобождает место этого
+        соединения, а созданные до него уже лежат в пуле.
+        """
+        while True:
+            with self.condition:
+                if self.size >= self.min_size:
+                    return
+                self.size += 1
+            self.putconn(self.new_connection())
+
+    def new_connection(self):
+        """Открывает соединение на уже занятое место пула."""
+        try:
+            connection = self.connect()
+        except BaseException:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.created[id(connection)] = monotonic()
+        return connection
+
+    def getconn(self):
+        deadline = monotonic() + self.timeout
+        while True:
+            with self.condition:
+                while not self.idle and self.size >= self.max_size:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(
+                            f'Нет свободных соединений за {self.timeout} с'
+                        )
+                    self.condition.wait(remaining)
+                if not self.idle:
+                    self.size += 1
+                    break
+                connection, returned_at = self.idle.pop()
+            if self.is_healthy(connection, returned_at):
+                return connection
+            self.discard(connection)
+        return self.new_connection()
+
+    def is_healthy(self, connection, returned_at):
+        if connection.closed:
+            return False
+        if monotonic() - returned_at < self.check_idle:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Exception:
+            return False
+        return True
+
+    def putconn(self, connection):
+        with self.condition:
+            created = self.created.get(id(connection), 0)
+        expired = monotonic() - created > self.max_age
+        if connection.closed or expired:
+            self.discard(connection)
+            return
+        status = connection.info.transaction_status
+        if status in (TRANSACTION_STATUS_INTRANS, TRANSACTION_STATUS_INERROR):
+            try:
+                connection.rollback()
+            except Exception:
+                self.discard(connection)
+                return
+        elif status != TRANSACTION_STATUS_IDLE:
+            self.discard(connection)
+            return
+        with self.condition:
+            self.idle.append((connection, monotonic()))
+            self.condition.notify()
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        finally:
+            with self.condition:
+                self.created.pop(id(connection), None)
+                self.size -= 1
+                self.condition.notify()
@@ -30,11 +30,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.ServerTimingMiddleware',
+    'api.middleware.CompressionMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -58,6 +62,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
+ASGI_APPLICATION = 'foodgram.asgi.application'
 
 USE_SQLITE = os.getenv('USE_SQLITE', 'false').lower() in ('true', '1')
 if USE_SQLITE:
@@ -76,9 +81,78 @@ else:
             'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'foodgram_password'),
             'HOST': os.getenv('DB_HOST', 'localhost'),
             'PORT': os.getenv('DB_PORT', '5432'),
+            'POOL': {
+                'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', '0')),
+                'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+                'MAX_AGE': float(os.getenv('DB_POOL_MAX_AGE', '3600')),
+                'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+                'CHECK_IDLE': float(os.getenv('DB_POOL_CHECK_IDLE', '30')),
+            },
         }
     }
 
+DATABASE_REPLICAS = [
+    replica for replica in os.getenv('DATABASE_REPLICAS', '').split(',')
+    if replica
+]
+for index, replica in enumerate(DATABASE_REPLICAS, start=1):
+    host, _, port = replica.partition(':')
+    DATABASES[f'replica_{index}'] = dict(
+        DATABASES['default'],
+        **(
+            {'NAME': BASE_DIR / replica} if USE_SQLITE
+            else {'HOST': host, 'PORT': port or DATABASES['default']['PORT']}
+        ),
+        TEST={'MIRROR': 'default'},
+    )
+DATABASE_ROUTERS = ['api.db_routers.ReplicaRouter']
+READ_YOUR_WRITES_SECONDS = int(os.getenv('READ_YOUR_WRITES_SECONDS', '10'))
+
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', '300'))
+
+FEED_FANOUT_LIMIT = int(os.getenv('FEED_FANOUT_LIMIT', '1000'))
+FEED_BACKFILL = int(os.getenv('FEED_BACKFILL', '50'))
+
+PROXY_CACHE_URL = os.getenv('PROXY_CACHE_URL', '').rstrip('/')
+PROXY_CACHE_REFRESH_KEY = os.getenv('PROXY_CACHE_REFRESH_KEY', '')
+PROXY_CACHE_HOSTS = [
+    host for host in os.getenv(
+        'PROXY_CACHE_HOSTS', ','.join(ALLOWED_HOSTS)
+    ).split(',')
+    if host and '*' not in host
+]
+PROXY_CACHE_LIST_PATHS = [
+    path for path in os.getenv(
+        'PROXY_CACHE_LIST_PATHS', '/api/recipes/?page=1&limit=6&fields=card'
+    ).split(',')
+    if path
+]
+
+CHANGES_SETTLE_SECONDS = float(os.getenv('CHANGES_SETTLE_SECONDS', '5'))
+CHANGES_RETENTION_DAYS = int(os.getenv('CHANGES_RETENTION_DAYS', '30'))
+
+WARMUP_PATHS = [
+    path for path in os.getenv(
+        'WARMUP_PATHS', '/api/tags/,/api/ingredients/?name=%D0%B0'
+    ).split(',')
+    if path
+] + PROXY_CACHE_LIST_PATHS
+
 AUTH_USER_MODEL = 'recipes.ProjectUser'
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -120,6 +194,48 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.metrics.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.TokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'downloads': os.getenv('THROTTLE_DOWNLOADS', '30/hour'),
+        'downloads_anon': os.getenv('THROTTLE_DOWNLOADS_ANON', '10/hour'),
+        'uploads': os.getenv('THROTTLE_UPLOADS', '60/hour'),
+        'uploads_anon': os.getenv('THROTTLE_UPLOADS_ANON', '10/hour'),
+        'subscriptions': os.getenv('THROTTLE_SUBSCRIPTIONS', '120/min'),
+        'subscriptions_anon': os.getenv(
+            'THROTTLE_SUBSCRIPTIONS_ANON', '30/min'
+        ),
+    },
+}
+THROTTLE_CACHE = os.getenv('THROTTLE_CACHE', 'default' if REDIS_URL else '')
+
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+
+ASYNC_READ_VIEWS = (
+    os.getenv('ASYNC_READ_VIEWS', 'false').lower() in ('true', '1')
+)
+
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '100'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api': {'handlers': ['console'], 'level': 'INFO'},
+    },
 }
 
 DJOSER = {
@@ -3,7 +3,12 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from api.metrics import metrics
+from api.querylog import slow_queries
+
 urlpatterns = [
+    path('metrics', metrics, name='metrics'),
+    path('admin/slow-queries/', slow_queries, name='slow_queries'),
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
     path('', include('recipes.urls')),
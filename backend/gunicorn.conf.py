@@ -0,0 +1,17 @@
+"""Настройки gunicorn: gunicorn читает этот файл из рабочего каталога.
+
+С preload_app приложение импортируется один раз в мастере и делится
+с воркерами через fork. Каждый воркер прогревается до приема
+запросов (api.warmup). GUNICORN_PRELOAD=false и WARMUP=false это
+отключают.
+"""
+import os
+
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() in ('true', '1')
+warmup = os.getenv('WARMUP', 'true').lower() in ('true', '1')
+
+
+def post_worker_init(worker):
+    if warmup:
+        from api.warmup import warm_up
+        warm_up()
@@ -14,3 +14,6 @@ MEASUREMENT_UNIT_MAX_LENGTH = 64
 INGREDIENT_AMOUNT_MIN = 1
 FULL_URL_MAX_LENGTH = 256
 INGREDIENT_AMOUNT_ZERO = 0
+BULK_MAX_IDS = 100
+SUBSCRIPTION_RECIPES_PER_TOKEN = 20
+SUBSCRIPTION_RECIPES_LIMIT = 20
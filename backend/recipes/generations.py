@@ -0,0 +1,47 @@
+"""Поколения моделей в общем кеше для инвалидации производных данных.
+
+Ключи кешей и индексы процессов включают поколения моделей, от которых
+зависят. Изменение модели увеличивает ее поколение, и записи со старым
+поколением больше не читаются.
+"""
+from time import time_ns
+
+from django.core.cache import cache
+
+GENERATION_KEY = 'generation:{}'
+RECIPES = 'recipes'
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+USERS = 'users'
+SCORES = 'scores'
+
+
+def generation_keys(names):
+    return [GENERATION_KEY.format(name) for name in names]
+
+
+def generation_values(keys, values):
+    return '.'.join(str(values.get(key, 0)) for key in keys)
+
+
+def get_generations(names):
+    keys = generation_keys(names)
+    return generation_values(keys, cache.get_many(keys))
+
+
+async def aget_generations(names):
+    keys = generation_keys(names)
+    return generation_values(keys, await cache.aget_many(keys))
+
+
+def bump(*names):
+    """Увеличивает поколения: ключи со старыми поколениями больше не читаются.
+
+    Отсутствующее поколение начинается с текущего времени, а не с нуля,
+    чтобы после вытеснения ключа из кеша не воскресли старые записи.
+    """
+    for key in generation_keys(names):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time_ns(), timeout=None)
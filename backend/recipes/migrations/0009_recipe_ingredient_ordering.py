@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-19 08:53
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='recipeingredient',
+            options={'ordering': ('recipe', 'id'), 'verbose_name': 'Продукт для рецепта', 'verbose_name_plural': 'Продукты для рецепта'},
+        ),
+    ]
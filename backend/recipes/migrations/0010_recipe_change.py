@@ -0,0 +1,44 @@
+# Generated by Django 4.2.16 on 2026-10-19 09:03
+
+from django.db import migrations, models
+
+
+def record_existing_recipes(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeChange = apps.get_model('recipes', 'RecipeChange')
+    RecipeChange.objects.bulk_create(
+        [
+            RecipeChange(recipe_id=recipe_id, operation='upsert')
+            for recipe_id in Recipe.objects.order_by('id').values_list(
+                'id', flat=True
+            )
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_ingredient_ordering'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe_id', models.BigIntegerField(verbose_name='id рецепта')),
+                ('operation', models.CharField(choices=[('upsert', 'Создан или изменен'), ('delete', 'Удален')], max_length=6, verbose_name='Операция')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Время изменения')),
+            ],
+            options={
+                'verbose_name': 'Изменение рецепта',
+                'verbose_name_plural': 'Журнал изменений рецептов',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.RunPython(
+            record_existing_recipes, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-19 09:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_change'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectuser',
+            name='feed_pulled',
+            field=models.BooleanField(db_index=True, default=False, help_text='Пересчитывается командой feed_authors', verbose_name='Рецепты подмешиваются в ленты при чтении'),
+        ),
+    ]
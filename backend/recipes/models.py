@@ -1,10 +1,10 @@
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db.models import (
-    CASCADE, CharField, CheckConstraint,
-    DateTimeField, EmailField, F, ForeignKey,
-    ImageField, ManyToManyField, Model,
-    PositiveSmallIntegerField, PositiveIntegerField, Q, SlugField,
+    BigIntegerField, BooleanField, CASCADE, CharField, CheckConstraint,
+    DateTimeField, EmailField, F, FloatField, ForeignKey,
+    ImageField, Index, ManyToManyField, Model,
+    PositiveSmallIntegerField, PositiveIntegerField, Q, QuerySet, SlugField,
     TextField, UniqueConstraint
 )
 from django.db.models.functions import Length
@@ -53,6 +53,12 @@ class ProjectUser(AbstractUser):
         null=True,
         upload_to='media/avatars/',
     )
+    feed_pulled = BooleanField(
+        verbose_name='Рецепты подмешиваются в ленты при чтении',
+        default=False,
+        db_index=True,
+        help_text='Пересчитывается командой feed_authors',
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = (
@@ -154,6 +160,15 @@ class Tag(Model):
         return self.name
 
 
+READ_PREFETCH = ('tags', 'recipe_ingredients__ingredient')
+
+
+class RecipeQuerySet(QuerySet):
+
+    def for_read(self, prefetch=READ_PREFETCH):
+        return self.select_related('author').prefetch_related(*prefetch)
+
+
 class Recipe(Model):
     name = CharField(
         max_length=RECIPE_NAME_MAX_LENGTH,
@@ -196,17 +211,168 @@ class Recipe(Model):
         blank=True,
         verbose_name='дата публикации рецепта',
     )
+    updated_at = DateTimeField(
+        auto_now=True,
+        verbose_name='дата изменения рецепта',
+    )
+    popular_score = FloatField(
+        default=0,
+        verbose_name='Популярность',
+    )
+    trending_score = FloatField(
+        default=0,
+        verbose_name='Популярность за последние дни',
+    )
+    favorites_count = PositiveIntegerField(
+        default=0,
+        verbose_name='В избранном',
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
         default_related_name = 'recipes'
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = (
+            Index(
+                fields=('author', '-pub_date', '-id'),
+                name='recipe_author_pub_date',
+            ),
+            Index(
+                fields=('-popular_score', '-id'),
+                name='recipe_popular',
+            ),
+            Index(
+                fields=('-trending_score', '-id'),
+                name='recipe_trending',
+            ),
+            Index(fields=('-pub_date', '-id'), name='recipe_pub_date'),
+            Index(fields=('cooking_time', 'id'), name='recipe_cooking_time'),
+            Index(fields=('name', 'id'), name='recipe_name'),
+            Index(
+                fields=('-favorites_count', '-id'),
+                name='recipe_favorites_count',
+            ),
+        )
 
     def __str__(self):
         return self.name
 
 
+class FeedEntry(Model):
+    """Рецепт в ленте подписчика, записанный при публикации."""
+
+    user = ForeignKey(
+        ProjectUser,
+        on_delete=CASCADE,
+        related_name='feed_entries',
+        verbose_name='Подписчик',
+    )
+    recipe = ForeignKey(
+        Recipe,
+        on_delete=CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт',
+    )
+    author = ForeignKey(
+        ProjectUser,
+        on_delete=CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    pub_date = DateTimeField(verbose_name='дата публикации рецепта')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+        constraints = (
+            UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feed_entry',
+            ),
+        )
+        indexes = (
+            Index(
+                fields=('user', '-pub_date', '-recipe'),
+                name='feed_entry_page',
+            ),
+        )
+
+    def __str__(self):
+        return f'Рецепт "{self.recipe}" в ленте {self.user}'
+
+
+class RecipeNeighbor(Model):
+    """Похожий рецепт, найденный командой similar_recipes."""
+
+    recipe = ForeignKey(
+        Recipe,
+        on_delete=CASCADE,
+        related_name='neighbors',
+        verbose_name='Рецепт',
+    )
+    neighbor = ForeignKey(
+        Recipe,
+        on_delete=CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт',
+    )
+    score = FloatField(verbose_name='Сходство')
+    computed_at = DateTimeField(verbose_name='Время расчета')
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = (
+            UniqueConstraint(
+                fields=('recipe', 'neighbor'),
+                name='unique_recipe_neighbor',
+            ),
+        )
+        indexes = (
+            Index(
+                fields=('recipe', '-score'),
+                name='recipe_neighbor_score',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.recipe} ~ {self.neighbor}: {self.score:.3f}'
+
+
+class RecipeChange(Model):
+    """Запись журнала изменений рецептов для инкрементальной синхронизации.
+
+    Пишется в той же транзакции, что и изменение рецепта; id записи
+    служит курсором. Рецепт хранится без внешнего ключа, чтобы запись
+    об удалении пережила сам рецепт.
+    """
+
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+
+    recipe_id = BigIntegerField(verbose_name='id рецепта')
+    operation = CharField(
+        max_length=6,
+        choices=((UPSERT, 'Создан или изменен'), (DELETE, 'Удален')),
+        verbose_name='Операция',
+    )
+    created_at = DateTimeField(
+        auto_now_add=True,
+        verbose_name='Время изменения',
+    )
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Изменение рецепта'
+        verbose_name_plural = 'Журнал изменений рецептов'
+
+    def __str__(self):
+        return f'{self.id}: {self.operation} {self.recipe_id}'
+
+
 class RecipeIngredient(Model):
     recipe = ForeignKey(
         Recipe,
@@ -226,7 +392,7 @@ class RecipeIngredient(Model):
     )
 
     class Meta:
-        ordering = ('recipe',)
+        ordering = ('recipe', 'id')
         verbose_name = 'Продукт для рецепта'
         verbose_name_plural = 'Продукты для рецепта'
         constraints = (
@@ -255,6 +421,10 @@ class BaseUserRecipeRelation(Model):
         on_delete=CASCADE,
         verbose_name='Рецепт',
     )
+    created_at = DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата добавления',
+    )
 
     class Meta:
         abstract = True
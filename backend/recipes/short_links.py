@@ -0,0 +1,132 @@
+"""Короткие ссылки на рецепты: base62-коды и проверка id без запросов к БД.
+
+Ссылки вида /s/c/<код>/ несут id рецепта в base62. Выданные раньше
+ссылки /s/<id>/ с десятичным id продолжают работать.
+
+Множество существующих id рецептов хранится в памяти процесса битовой
+картой в целом числе Python. Рецепты, созданные и удаленные в этом
+процессе, отмечаются сигналами сразу; изменения из других процессов
+догружаются, когда меняется поколение рецептов в общем кеше. Рецепт,
+удаленный в другом процессе, пропадает из карты при полной перезагрузке
+раз в FULL_RELOAD_SECONDS, а до нее ссылка ведет на страницу рецепта,
+которая сама покажет, что его нет.
+"""
+from datetime import timedelta
+from threading import Lock
+from time import monotonic
+
+from asgiref.sync import sync_to_async
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from recipes.generations import RECIPES, aget_generations, get_generations
+from recipes.models import Recipe
+
+ALPHABET = (
+    '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+)
+DIGITS = {symbol: value for value, symbol in enumerate(ALPHABET)}
+REFRESH_OVERLAP = timedelta(minutes=1)
+FULL_RELOAD_SECONDS = 300
+
+
+def ids_bitmap(ids):
+    ids = list(ids)
+    bits = bytearray(max(ids, default=0) // 8 + 1)
+    for recipe_id in ids:
+        bits[recipe_id >> 3] |= 1 << (recipe_id & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def encode(number):
+    code = ''
+    while True:
+        number, digit = divmod(number, len(ALPHABET))
+        code = ALPHABET[digit] + code
+        if not number:
+            return code
+
+
+def decode(code):
+    number = 0
+    for symbol in code:
+        number = number * len(ALPHABET) + DIGITS[symbol]
+    return number
+
+
+class ShortCodeConverter:
+    """Конвертер пути: в URL base62-код, во view — id рецепта."""
+
+    regex = '[0-9a-zA-Z]{1,11}'
+
+    def to_python(self, value):
+        return decode(value)
+
+    def to_url(self, value):
+        return encode(int(value))
+
+
+class RecipeIds:
+    def __init__(self):
+        self.lock = Lock()
+        self.bitmap = 0
+        self.generation = None
+        self.refreshed_at = None
+        self.reloaded_at = None
+
+    def needs_reload(self):
+        return (
+            self.reloaded_at is None
+            or monotonic() - self.reloaded_at > FULL_RELOAD_SECONDS
+        )
+
+    def stale(self, generation):
+        return generation != self.generation or self.needs_reload()
+
+    def refresh(self, generation):
+        """Перезагружает карту целиком или догружает измененные рецепты.
+
+        Окно захватывает минуту до прошлого обновления, чтобы не пропустить
+        транзакции, закоммиченные позже выставленного в них updated_at.
+        Читает из primary, чтобы не записать под новым поколением карту
+        из отставшей реплики.
+        """
+        with self.lock:
+            if not self.stale(generation):
+                return
+            started = timezone.now()
+            full = self.needs_reload()
+            queryset = Recipe.objects.using(DEFAULT_DB_ALIAS)
+            if not full:
+                queryset = queryset.filter(
+                    updated_at__gte=self.refreshed_at - REFRESH_OVERLAP
+                )
+            bitmap = ids_bitmap(queryset.values_list('id', flat=True))
+            self.bitmap = bitmap if full else self.bitmap | bitmap
+            self.generation = generation
+            self.refreshed_at = started
+            if full:
+                self.reloaded_at = monotonic()
+
+    def __contains__(self, recipe_id):
+        generation = get_generations((RECIPES,))
+        if self.stale(generation):
+            self.refresh(generation)
+        return self.bitmap >> recipe_id & 1 == 1
+
+    async def acontains(self, recipe_id):
+        generation = await aget_generations((RECIPES,))
+        if self.stale(generation):
+            await sync_to_async(self.refresh)(generation)
+        return self.bitmap >> recipe_id & 1 == 1
+
+    def add(self, recipe_id):
+        with self.lock:
+            self.bitmap |= 1 << recipe_id
+
+    def discard(self, recipe_id):
+        with self.lock:
+            self.bitmap &= ~(1 << recipe_id)
+
+
+recipe_ids = RecipeIds()
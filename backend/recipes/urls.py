@@ -1,7 +1,14 @@
-from django.urls import path
+from django.conf import settings
+from django.urls import path, register_converter
 
-from recipes.views import short_url
+from recipes.short_links import ShortCodeConverter
+from recipes.views import async_short_url, short_url
+
+register_converter(ShortCodeConverter, 'short')
+
+short_url_view = async_short_url if settings.ASYNC_READ_VIEWS else short_url
 
 urlpatterns = [
-    path('s/<int:pk>/', short_url, name='short_url'),
+    path('s/<int:pk>/', short_url_view, name='short_url'),
+    path('s/c/<short:pk>/', short_url_view, name='short_code_url'),
 ]
@@ -1,10 +1,16 @@
-from django.core.exceptions import ValidationError
+from django.http import Http404
 from django.shortcuts import redirect
 
-from recipes.models import Recipe
+from recipes.short_links import recipe_ids
 
 
 def short_url(request, pk):
-    if not Recipe.objects.filter(pk=pk).exists():
-        raise ValidationError(f'Рецепт {pk} не существует.')
+    if pk not in recipe_ids:
+        raise Http404(f'Рецепт {pk} не существует.')
+    return redirect(f'/recipes/{pk}/')
+
+
+async def async_short_url(request, pk):
+    if not await recipe_ids.acontains(pk):
+        raise Http404(f'Рецепт {pk} не существует.')
     return redirect(f'/recipes/{pk}/')
@@ -132,6 +132,7 @@ class Api {
     is_in_shopping_cart = 0,
     author,
     tags,
+    fields = "card",
   } = {}) {
     const token = localStorage.getItem("token");
     const authorization = token ? { authorization: `Token ${token}` } : {};
@@ -142,7 +143,7 @@ class Api {
           .join("")
       : "";
     return fetch(
-      `/api/recipes/?page=${page}&limit=${limit}${
+      `/api/recipes/?page=${page}&limit=${limit}&fields=${fields}${
         author ? `&author=${author}` : ""
       }${is_favorited ? `&is_favorited=${is_favorited}` : ""}${
         is_in_shopping_cart ? `&is_in_shopping_cart=${is_in_shopping_cart}` : ""